@@ -33,7 +33,8 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 # Override the sqlalchemy.url with DATABASE_URL from environment
-database_url = os.getenv('DATABASE_URL')
+# (run_migrations.py passes the URL of each shard explicitly)
+database_url = config.attributes.get('database_url') or os.getenv('DATABASE_URL')
 if not database_url:
     print("Error: DATABASE_URL environment variable is not set")
     sys.exit(1)
@@ -57,6 +58,18 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
+    # Reuse a connection handed in by run_migrations.py, which holds the
+    # migration lock on it
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section),
         prefix="sqlalchemy.",
@@ -0,0 +1,57 @@
+"""Add global user directory for shard routing
+
+Revision ID: 527264f36d04
+Revises: 79e3218e5e70
+Create Date: 2026-10-19 12:26:53.104471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = '527264f36d04'
+down_revision: Union[str, Sequence[str], None] = '79e3218e5e70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_directory',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('moving', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_user_directory_email'), 'user_directory', ['email'], unique=True)
+
+    # Existing users all live on the database being migrated; route them to
+    # its position in DATABASE_SHARD_URLS (shard 0 when unsharded). The app
+    # refuses to start if this database is not one of the configured shards.
+    database_url = op.get_context().config.attributes.get('database_url') or os.getenv('DATABASE_URL')
+    shard_urls = [url.strip() for url in os.getenv('DATABASE_SHARD_URLS', '').split(',') if url.strip()]
+    home_shard = shard_urls.index(database_url) if database_url in shard_urls else 0
+    op.execute(
+        sa.text(
+            "INSERT INTO user_directory (user_id, email, shard, moving) "
+            "SELECT id, email, :shard, false FROM users"
+        ).bindparams(shard=home_shard)
+    )
+
+    # Keep new directory ids above the backfilled ones
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "SELECT setval(pg_get_serial_sequence('user_directory', 'user_id'), "
+            "COALESCE((SELECT MAX(user_id) FROM user_directory), 0) + 1, false)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_directory_email'), table_name='user_directory')
+    op.drop_table('user_directory')
@@ -0,0 +1,51 @@
+"""Add fractional index position to todos
+
+Revision ID: 6b70395f46ef
+Revises: b672cd0b4e96
+Create Date: 2026-10-19 09:12:44.318020
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.fractional_index import evenly_spaced_keys
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b70395f46ef'
+down_revision: Union[str, Sequence[str], None] = 'b672cd0b4e96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('todos', sa.Column('position', sa.String(), nullable=True))
+
+    # Backfill positions in the existing id order for each user
+    connection = op.get_bind()
+    todos = sa.table('todos', sa.column('id', sa.Integer()), sa.column('user_id', sa.Integer()), sa.column('position', sa.String()))
+    rows = connection.execute(sa.select(todos.c.id, todos.c.user_id).order_by(todos.c.user_id, todos.c.id)).fetchall()
+
+    by_user = {}
+    for todo_id, user_id in rows:
+        by_user.setdefault(user_id, []).append(todo_id)
+
+    update = todos.update().where(todos.c.id == sa.bindparam('todo_id')).values(position=sa.bindparam('new_position'))
+    for todo_ids in by_user.values():
+        keys = evenly_spaced_keys(len(todo_ids))
+        connection.execute(update, [{'todo_id': todo_id, 'new_position': key} for todo_id, key in zip(todo_ids, keys)])
+
+    with op.batch_alter_table('todos') as batch_op:
+        batch_op.alter_column('position', existing_type=sa.String(), nullable=False)
+
+    op.create_index('ix_todos_user_id_position', 'todos', ['user_id', 'position'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_user_id_position', table_name='todos')
+    with op.batch_alter_table('todos') as batch_op:
+        batch_op.drop_column('position')
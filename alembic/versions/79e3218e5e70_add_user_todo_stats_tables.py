@@ -0,0 +1,60 @@
+"""Add per-user todo stats counter tables
+
+Revision ID: 79e3218e5e70
+Revises: 6b70395f46ef
+Create Date: 2026-10-19 10:41:07.552914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '79e3218e5e70'
+down_revision: Union[str, Sequence[str], None] = '6b70395f46ef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_todo_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('user_todo_daily_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('created', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+    # Backfill counters from existing todos
+    op.execute(
+        "INSERT INTO user_todo_stats (user_id, total, completed) "
+        "SELECT user_id, COUNT(id), SUM(CASE WHEN completed THEN 1 ELSE 0 END) "
+        "FROM todos GROUP BY user_id"
+    )
+    op.execute(
+        "INSERT INTO user_todo_daily_stats (user_id, day, created, completed) "
+        "SELECT user_id, day, SUM(created), SUM(completed) FROM ("
+        "SELECT user_id, DATE(created_at) AS day, 1 AS created, 0 AS completed "
+        "FROM todos WHERE created_at IS NOT NULL "
+        "UNION ALL "
+        "SELECT user_id, DATE(COALESCE(updated_at, created_at)) AS day, 0 AS created, 1 AS completed "
+        "FROM todos WHERE completed AND COALESCE(updated_at, created_at) IS NOT NULL"
+        ") AS events GROUP BY user_id, day"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_todo_daily_stats')
+    op.drop_table('user_todo_stats')
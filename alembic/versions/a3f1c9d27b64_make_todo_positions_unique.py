@@ -0,0 +1,51 @@
+"""Make todo positions unique per user
+
+Revision ID: a3f1c9d27b64
+Revises: 527264f36d04
+Create Date: 2026-10-19 15:02:18.447291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.fractional_index import evenly_spaced_keys
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9d27b64'
+down_revision: Union[str, Sequence[str], None] = '527264f36d04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Concurrent creates could have written the same key twice; re-key those
+    # users' lists in their current order before enforcing uniqueness
+    connection = op.get_bind()
+    todos = sa.table('todos', sa.column('id', sa.Integer()), sa.column('user_id', sa.Integer()), sa.column('position', sa.String()))
+    duplicated_users = connection.execute(
+        sa.select(todos.c.user_id)
+        .group_by(todos.c.user_id, todos.c.position)
+        .having(sa.func.count(todos.c.id) > 1)
+        .distinct()
+    ).scalars().all()
+
+    update = todos.update().where(todos.c.id == sa.bindparam('todo_id')).values(position=sa.bindparam('new_position'))
+    for user_id in duplicated_users:
+        todo_ids = connection.execute(
+            sa.select(todos.c.id).where(todos.c.user_id == user_id).order_by(todos.c.position, todos.c.id)
+        ).scalars().all()
+        keys = evenly_spaced_keys(len(todo_ids))
+        connection.execute(update, [{'todo_id': todo_id, 'new_position': key} for todo_id, key in zip(todo_ids, keys)])
+
+    op.drop_index('ix_todos_user_id_position', table_name='todos')
+    op.create_index('ix_todos_user_id_position', 'todos', ['user_id', 'position'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_user_id_position', table_name='todos')
+    op.create_index('ix_todos_user_id_position', 'todos', ['user_id', 'position'], unique=False)
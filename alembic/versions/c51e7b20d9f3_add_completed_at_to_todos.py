@@ -0,0 +1,48 @@
+"""Add completed_at to todos
+
+Revision ID: c51e7b20d9f3
+Revises: a3f1c9d27b64
+Create Date: 2026-10-19 15:40:51.902364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c51e7b20d9f3'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c9d27b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('todos', sa.Column('completed_at', sa.DateTime(), nullable=True))
+
+    # Best available completion time for todos completed before this column existed
+    op.execute(
+        "UPDATE todos SET completed_at = COALESCE(updated_at, created_at) WHERE completed"
+    )
+
+    # Daily counters now track surviving todos by creation day and completed
+    # todos by completion day; recompute them under the new definition
+    op.execute("DELETE FROM user_todo_daily_stats")
+    op.execute(
+        "INSERT INTO user_todo_daily_stats (user_id, day, created, completed) "
+        "SELECT user_id, day, SUM(created), SUM(completed) FROM ("
+        "SELECT user_id, DATE(created_at) AS day, 1 AS created, 0 AS completed "
+        "FROM todos WHERE created_at IS NOT NULL "
+        "UNION ALL "
+        "SELECT user_id, DATE(completed_at) AS day, 0 AS created, 1 AS completed "
+        "FROM todos WHERE completed AND completed_at IS NOT NULL"
+        ") AS events GROUP BY user_id, day"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('todos') as batch_op:
+        batch_op.drop_column('completed_at')
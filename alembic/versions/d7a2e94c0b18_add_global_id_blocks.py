@@ -0,0 +1,39 @@
+"""Add global id blocks for todo ids
+
+Revision ID: d7a2e94c0b18
+Revises: c51e7b20d9f3
+Create Date: 2026-10-19 16:18:05.631847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a2e94c0b18'
+down_revision: Union[str, Sequence[str], None] = 'c51e7b20d9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('id_blocks',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('next_id', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Only the primary's row is used; workers raise it above every shard's
+    # highest todo id at startup
+    op.execute(
+        "INSERT INTO id_blocks (name, next_id) "
+        "SELECT 'todos', COALESCE(MAX(id), 0) + 1 FROM todos"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('id_blocks')
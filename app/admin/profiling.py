@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from app.config import settings
+from app.database.models import User
+from app.utils.profiling import ProfileRing, ProfilingController
+from app.utils.security import get_current_admin
+
+router = APIRouter()
+
+# Profiling state is per worker process; profiles share one on-disk ring
+profiler = ProfilingController(
+    ProfileRing(settings.profile_dir, settings.profile_ring_size),
+    interval=settings.profile_interval_ms / 1000
+)
+
+
+class ProfileNextRequests(BaseModel):
+    requests: int = Field(..., ge=0, le=1000)
+
+
+class ProfileRouteRate(BaseModel):
+    route: str
+    rate: float = Field(..., ge=0.0, le=1.0)
+
+
+@router.get("/")
+def get_profiling_status(admin: User = Depends(get_current_admin)):
+    """Get this worker's profiling switches and the stored profiles."""
+    return profiler.status()
+
+
+@router.post("/next")
+def profile_next_requests(
+    data: ProfileNextRequests,
+    admin: User = Depends(get_current_admin)
+):
+    """Profile the next N requests handled by this worker."""
+    profiler.profile_next(data.requests)
+    return profiler.status()
+
+
+@router.post("/routes")
+def set_route_sample_rate(
+    data: ProfileRouteRate,
+    admin: User = Depends(get_current_admin)
+):
+    """Profile a fraction of requests to a route template (rate 0 stops it)."""
+    profiler.set_route_rate(data.route, data.rate)
+    return profiler.status()
+
+
+@router.delete("/")
+def disable_profiling(admin: User = Depends(get_current_admin)):
+    """Turn off all profiling on this worker."""
+    profiler.disable()
+    return profiler.status()
+
+
+@router.get("/profiles/{name}", response_class=PlainTextResponse)
+def get_profile(name: str, admin: User = Depends(get_current_admin)):
+    """Download a stored profile in collapsed-stack (flamegraph) format."""
+    profile = profiler.ring.read(name)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile
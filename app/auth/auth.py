@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from typing import Optional
 import re
 
-from app.database.database import get_db
-from app.database.models import User
+from app.database.database import get_db, get_shard_session, is_primary_shard, shard_for_user
+from app.database.models import User, UserDirectory
 from app.utils.security import (
     authenticate_user,
     create_access_token,
+    get_directory_entry,
     get_password_hash,
     verify_password
 )
@@ -44,7 +46,7 @@ def signup(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = get_directory_entry(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -54,15 +56,42 @@ def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     # Hash the password
     hashed_password = get_password_hash(user_data.password)
 
-    # Create new user
+    # Reserve the email and a globally unique user id in the directory
+    entry = UserDirectory(email=user_data.email, shard=0)
+    db.add(entry)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User with this email already exists"
+        )
+    entry.shard = shard_for_user(entry.user_id)
+
+    # Create new user on its home shard
     user = User(
+        id=entry.user_id,
         email=user_data.email,
         hashed_password=hashed_password
     )
 
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    if is_primary_shard(entry.shard):
+        # Same database as the directory: a single transaction covers both
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    else:
+        shard_db = get_shard_session(entry.shard)
+        try:
+            shard_db.add(user)
+            shard_db.commit()
+            shard_db.refresh(user)
+        finally:
+            shard_db.close()
+
+        # Only publish the directory entry once the user row exists
+        db.commit()
 
     return UserResponse(id=user.id, email=user.email)
 
@@ -88,7 +117,7 @@ def login(login_data: LoginData, db: Session = Depends(get_db)):
     from app.utils.security import ACCESS_TOKEN_EXPIRE_MINUTES
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
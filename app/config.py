@@ -3,10 +3,13 @@ Configuration module for the Todo API application.
 Handles environment variable validation and settings.
 """
 
+import logging
 import os
 import sys
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 
 class Settings:
     """Application settings loaded from environment variables."""
@@ -28,8 +31,11 @@ class Settings:
                 missing_vars.append(var)
 
         if missing_vars:
-            print(f"Error: Required environment variables are not set: {', '.join(missing_vars)}")
-            print("Please set these variables in your environment or .env file.")
+            logger.error(
+                "Required environment variables are not set: %s. "
+                "Please set these variables in your environment or .env file.",
+                ", ".join(missing_vars)
+            )
             sys.exit(1)
 
     @property
@@ -48,9 +54,27 @@ class Settings:
         try:
             return int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
         except ValueError:
-            print("Warning: ACCESS_TOKEN_EXPIRE_MINUTES is not a valid integer, using default value of 30")
+            logger.warning("ACCESS_TOKEN_EXPIRE_MINUTES is not a valid integer, using default value of 30")
             return 30
 
+    @property
+    def db_warmup_connections(self) -> int:
+        """Get the number of pooled connections to open at worker startup."""
+        try:
+            return max(int(os.getenv("DB_WARMUP_CONNECTIONS", "4")), 0)
+        except ValueError:
+            logger.warning("DB_WARMUP_CONNECTIONS is not a valid integer, using default value of 4")
+            return 4
+
+    @property
+    def position_rebalance_length(self) -> int:
+        """Get the todo position key length that triggers a rebalance."""
+        try:
+            return int(os.getenv("POSITION_REBALANCE_LENGTH", "32"))
+        except ValueError:
+            logger.warning("POSITION_REBALANCE_LENGTH is not a valid integer, using default value of 32")
+            return 32
+
     @property
     def cors_allowed_origins(self) -> list:
         """Get the allowed CORS origins from environment."""
@@ -64,6 +88,49 @@ class Settings:
 
         return cors_origins
 
+    @property
+    def log_level(self) -> str:
+        """Get the log level from environment."""
+        return os.getenv("LOG_LEVEL", "INFO")
+
+    @property
+    def log_sample_rate(self) -> float:
+        """Get the fraction of per-request access logs to emit (0.0 - 1.0)."""
+        try:
+            return min(max(float(os.getenv("LOG_SAMPLE_RATE", "1.0")), 0.0), 1.0)
+        except ValueError:
+            logger.warning("LOG_SAMPLE_RATE is not a valid number, using default value of 1.0")
+            return 1.0
+
+    @property
+    def admin_emails(self) -> list:
+        """Get the emails of users allowed to use admin endpoints."""
+        admin_emails_str = os.getenv("ADMIN_EMAILS", "")
+        return [email.strip() for email in admin_emails_str.split(",") if email.strip()]
+
+    @property
+    def profile_dir(self) -> str:
+        """Get the directory where request profiles are written."""
+        return os.getenv("PROFILE_DIR", "/tmp/todo-profiles")
+
+    @property
+    def profile_ring_size(self) -> int:
+        """Get the number of request profiles kept on disk."""
+        try:
+            return max(int(os.getenv("PROFILE_RING_SIZE", "20")), 1)
+        except ValueError:
+            logger.warning("PROFILE_RING_SIZE is not a valid integer, using default value of 20")
+            return 20
+
+    @property
+    def profile_interval_ms(self) -> float:
+        """Get the stack sampling interval of the request profiler."""
+        try:
+            return max(float(os.getenv("PROFILE_INTERVAL_MS", "5")), 0.1)
+        except ValueError:
+            logger.warning("PROFILE_INTERVAL_MS is not a valid number, using default value of 5")
+            return 5.0
+
     @property
     def environment(self) -> str:
         """Get the environment (development, production, etc.)"""
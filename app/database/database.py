@@ -1,10 +1,13 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, func, select, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+import logging
 import os
 import sys
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
@@ -13,47 +16,126 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 # Validate DATABASE_URL is set
 if not DATABASE_URL:
-    print("Error: DATABASE_URL environment variable is not set.")
-    print("Please set DATABASE_URL with your database connection string.")
+    logger.error(
+        "DATABASE_URL environment variable is not set. "
+        "Please set DATABASE_URL with your database connection string."
+    )
     # Don't exit here, let the application handle it during startup
     # sys.exit(1)  # Commented out to prevent early exit
 
-# Determine if using PostgreSQL vs SQLite for engine configuration
-if "postgresql" in DATABASE_URL.lower():
-    # PostgreSQL-specific engine configuration
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,           # Verify connections before use
-        pool_recycle=300,             # Recycle connections every 5 minutes
-        pool_size=20,                 # Number of connection pools
-        max_overflow=30,              # Additional connections beyond pool_size
-        echo=False                    # Set to True only for debugging
-    )
-elif "sqlite" in DATABASE_URL.lower():
-    # SQLite-specific engine configuration
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        echo=False                    # Set to True only for debugging
-    )
-else:
-    print(f"Error: Unsupported database type in DATABASE_URL: {DATABASE_URL}")
-    sys.exit(1)
+# Optional comma-separated shard URLs; users and todos are spread across them
+# while DATABASE_URL keeps the global user directory
+DATABASE_SHARD_URLS = [
+    url.strip() for url in os.getenv("DATABASE_SHARD_URLS", "").split(",") if url.strip()
+]
+
+
+def create_database_engine(database_url: str):
+    """Create an engine configured for the database type in the URL."""
+    # Determine if using PostgreSQL vs SQLite for engine configuration
+    if "postgresql" in database_url.lower():
+        # PostgreSQL-specific engine configuration
+        return create_engine(
+            database_url,
+            pool_pre_ping=True,           # Verify connections before use
+            pool_recycle=300,             # Recycle connections every 5 minutes
+            pool_size=20,                 # Number of connection pools
+            max_overflow=30,              # Additional connections beyond pool_size
+            echo=False                    # Set to True only for debugging
+        )
+    elif "sqlite" in database_url.lower():
+        # SQLite-specific engine configuration
+        return create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+            echo=False                    # Set to True only for debugging
+        )
+    else:
+        logger.error("Unsupported database type in DATABASE_URL: %s", database_url)
+        sys.exit(1)
+
+
+engine = create_database_engine(DATABASE_URL)
 
 # Create session maker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Without DATABASE_SHARD_URLS the primary database is the only shard
+shard_engines = [
+    engine if url == DATABASE_URL else create_database_engine(url)
+    for url in DATABASE_SHARD_URLS
+] or [engine]
+
+ShardSessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+    for shard_engine in shard_engines
+]
+
 # Create base class for models
 Base = declarative_base()
 
 # Dependency to get database session
 def get_db():
+    """Session on the primary database, which holds the user directory."""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+
+def shard_for_user(user_id: int) -> int:
+    """Deterministic home shard for a newly created user."""
+    return user_id % len(shard_engines)
+
+
+def get_shard_session(shard: int):
+    """Open a session on the given shard."""
+    if not 0 <= shard < len(ShardSessions):
+        raise ValueError(f"Unknown database shard: {shard}")
+    return ShardSessions[shard]()
+
+
+def is_primary_shard(shard: int) -> bool:
+    """Whether a shard lives on the primary database with the directory."""
+    return shard_engines[shard] is engine
+
+def verify_shard_directory() -> None:
+    """
+    Fail fast if the directory routes users to shards that don't hold them,
+    e.g. because DATABASE_SHARD_URLS was reordered or no longer lists the
+    primary. The lowest and highest user id routed to each shard are checked.
+    """
+    from app.database.models import User, UserDirectory
+
+    db = SessionLocal()
+    try:
+        routed = db.execute(
+            select(UserDirectory.shard, func.min(UserDirectory.user_id), func.max(UserDirectory.user_id))
+            .group_by(UserDirectory.shard)
+        ).all()
+    finally:
+        db.close()
+
+    for shard, lowest, highest in routed:
+        if not 0 <= shard < len(shard_engines):
+            raise RuntimeError(
+                f"The user directory routes users to shard {shard}, but only "
+                f"{len(shard_engines)} shard(s) are configured in DATABASE_SHARD_URLS"
+            )
+        shard_db = get_shard_session(shard)
+        try:
+            found = shard_db.scalar(
+                select(func.count(User.id)).where(User.id.in_({lowest, highest}))
+            )
+        finally:
+            shard_db.close()
+        if found != len({lowest, highest}):
+            raise RuntimeError(
+                f"The user directory routes users to shard {shard}, but they are not "
+                f"stored there; check the order of DATABASE_SHARD_URLS"
+            )
+
 # Function to test database connectivity
 def test_db_connection():
     """
@@ -67,5 +149,54 @@ def test_db_connection():
         db.close()
         return result is not None
     except Exception as e:
-        print(f"Database connectivity test failed: {str(e)}")
-        return False
\ No newline at end of file
+        logger.error("Database connectivity test failed: %s", e)
+        return False
+
+# Function to warm up the connection pool and statement cache
+def warm_up_database(connections: int = 1) -> bool:
+    """
+    Open pooled connections and pre-compile the hot queries on every shard.
+    Called once per worker at startup so the first requests don't pay for
+    connection setup and statement compilation.
+    """
+    from app.database.queries import DIRECTORY_WARMUP_STATEMENTS, WARMUP_STATEMENTS
+
+    for shard, shard_engine in enumerate(shard_engines):
+        checked_out = []
+        try:
+            # Check out several connections at once so the pool actually grows,
+            # then hand them all back for the first requests to reuse
+            for _ in range(max(connections, 1)):
+                connection = shard_engine.connect()
+                checked_out.append(connection)
+                connection.execute(text("SELECT 1"))
+        except Exception as e:
+            logger.warning("Database connection warm-up failed on shard %s: %s", shard, e)
+            return False
+        finally:
+            for connection in checked_out:
+                connection.close()
+
+        try:
+            db = get_shard_session(shard)
+            try:
+                for statement, params in WARMUP_STATEMENTS:
+                    db.execute(statement, params).all()
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning("Statement cache warm-up failed on shard %s: %s", shard, e)
+            return False
+
+    try:
+        db = SessionLocal()
+        try:
+            for statement, params in DIRECTORY_WARMUP_STATEMENTS:
+                db.execute(statement, params).all()
+        finally:
+            db.close()
+    except Exception as e:
+        logger.warning("Statement cache warm-up failed on the user directory: %s", e)
+        return False
+
+    return True
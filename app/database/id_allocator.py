@@ -0,0 +1,84 @@
+"""
+Globally unique row ids for sharded tables.
+
+Ids are reserved in blocks from a counter row on the primary database, so
+rows keep their id when a user moves between shards and each worker only
+goes back to the primary once per block.
+"""
+
+import threading
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database.database import engine, shard_engines
+from app.database.models import IdBlock, Todo
+
+
+class IdBlockAllocator:
+    """Hand out ids from blocks reserved on the primary database."""
+
+    def __init__(self, name: str, block_size: int = 100):
+        self.name = name
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def allocate(self) -> int:
+        """Return an id no other worker or shard will ever use."""
+        with self._lock:
+            if self._next >= self._end:
+                self._end = self._reserve(self.block_size)
+                self._next = self._end - self.block_size
+            allocated = self._next
+            self._next += 1
+            return allocated
+
+    def _reserve(self, size: int) -> int:
+        """Advance the shared counter by size and return the new end (exclusive)."""
+        while True:
+            with engine.begin() as connection:
+                result = connection.execute(
+                    update(IdBlock)
+                    .where(IdBlock.name == self.name)
+                    .values(next_id=IdBlock.next_id + size)
+                )
+                if result.rowcount:
+                    return connection.scalar(select(IdBlock.next_id).where(IdBlock.name == self.name))
+
+            # First use on a database created without migrations
+            self._create_counter(1)
+
+    def ensure_above(self, value: int) -> None:
+        """Make sure future blocks start after an id that is already in use."""
+        with engine.begin() as connection:
+            result = connection.execute(
+                update(IdBlock)
+                .where(IdBlock.name == self.name)
+                .values(next_id=case((IdBlock.next_id > value, IdBlock.next_id), else_=value + 1))
+            )
+        if not result.rowcount:
+            # No counter yet: create it, or raise the one another worker just created
+            self._create_counter(value + 1)
+            self.ensure_above(value)
+
+    def _create_counter(self, next_id: int) -> None:
+        """Insert the counter row unless another worker got there first."""
+        try:
+            with engine.begin() as connection:
+                connection.execute(IdBlock.__table__.insert().values(name=self.name, next_id=next_id))
+        except IntegrityError:
+            pass
+
+
+todo_ids = IdBlockAllocator("todos")
+
+
+def sync_todo_ids() -> None:
+    """Start todo ids after the highest todo id on any shard."""
+    highest = 0
+    for shard_engine in shard_engines:
+        with shard_engine.connect() as connection:
+            highest = max(highest, connection.scalar(select(func.max(Todo.id))) or 0)
+    todo_ids.ensure_above(highest)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.database import Base
@@ -18,16 +18,69 @@ class User(Base):
     todos = relationship("Todo", back_populates="owner", cascade="all, delete-orphan")
 
 
+class UserDirectory(Base):
+    __tablename__ = "user_directory"
+
+    # Global email -> user lookup kept on the primary database. User ids are
+    # allocated here so they stay unique across shards.
+    user_id = Column(Integer, primary_key=True)
+    email = Column(String, unique=True, index=True, nullable=False)
+    shard = Column(Integer, default=0, nullable=False)
+    # Set while the user is being moved between shards; writes are rejected
+    moving = Column(Boolean, default=False, nullable=False)
+
+
+class IdBlock(Base):
+    __tablename__ = "id_blocks"
+
+    # Next unreserved id of a global sequence, kept on the primary database so
+    # rows on different shards never share an id
+    name = Column(String, primary_key=True)
+    next_id = Column(BigInteger, nullable=False)
+
+
 class Todo(Base):
     __tablename__ = "todos"
 
+    # Allocated globally (see app.database.id_allocator) so ids survive shard moves
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
     completed = Column(Boolean, default=False, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, server_default=func.now())
+    # Fractional index key, unique per user; todos are listed in ascending position order
+    position = Column(String, nullable=False)
+    # Stamped in UTC by the app, the same clock as completed_at and the stats
+    # window; the server default only covers rows inserted outside the ORM
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
+    # When the todo was last marked completed; cleared when it is reopened
+    completed_at = Column(DateTime, nullable=True)
 
     # Relationship to user
-    owner = relationship("User", back_populates="todos")
\ No newline at end of file
+    owner = relationship("User", back_populates="todos")
+
+    __table_args__ = (
+        Index("ix_todos_user_id_position", "user_id", "position", unique=True),
+    )
+
+    # Load created_at on insert so the daily counters can use the stored value
+    __mapper_args__ = {"eager_defaults": True}
+
+
+class UserTodoStats(Base):
+    __tablename__ = "user_todo_stats"
+
+    # Counters maintained in the same transaction as todo writes
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+    completed = Column(Integer, default=0, nullable=False)
+
+
+class UserTodoDailyStats(Base):
+    __tablename__ = "user_todo_daily_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    created = Column(Integer, default=0, nullable=False)
+    completed = Column(Integer, default=0, nullable=False)
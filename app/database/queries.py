@@ -0,0 +1,70 @@
+from sqlalchemy import bindparam, func, or_, select, update
+
+from app.database.models import Todo, User, UserDirectory, UserTodoDailyStats
+
+# Hot statements are built once at import time with bound parameters so that
+# every request reuses the same cache key and hits SQLAlchemy's compiled cache.
+SELECT_DIRECTORY_ENTRY_BY_EMAIL = (
+    select(UserDirectory).where(UserDirectory.email == bindparam("email")).limit(1)
+)
+
+SELECT_TODOS_FOR_USER = (
+    select(Todo)
+    .where(Todo.user_id == bindparam("user_id"))
+    .order_by(Todo.position, Todo.id)
+)
+
+SELECT_LAST_POSITION_FOR_USER = select(func.max(Todo.position)).where(
+    Todo.user_id == bindparam("user_id")
+)
+
+SELECT_PREVIOUS_POSITION = select(func.max(Todo.position)).where(
+    Todo.user_id == bindparam("user_id"),
+    Todo.position < bindparam("position"),
+    Todo.id != bindparam("todo_id"),
+)
+
+SELECT_NEXT_POSITION = select(func.min(Todo.position)).where(
+    Todo.user_id == bindparam("user_id"),
+    Todo.position > bindparam("position"),
+    Todo.id != bindparam("todo_id"),
+)
+
+SELECT_TODO_BY_ID = select(Todo).where(Todo.id == bindparam("todo_id")).limit(1)
+
+SELECT_DAILY_STATS_FOR_USER = (
+    select(UserTodoDailyStats)
+    .where(
+        UserTodoDailyStats.user_id == bindparam("user_id"),
+        UserTodoDailyStats.day >= bindparam("since"),
+        # Days whose todos were all deleted again are left at zero
+        or_(UserTodoDailyStats.created != 0, UserTodoDailyStats.completed != 0),
+    )
+    .order_by(UserTodoDailyStats.day)
+)
+
+# Rewrites positions without bumping updated_at (used by rebalancing)
+UPDATE_TODO_POSITION = (
+    update(Todo.__table__)
+    .where(Todo.__table__.c.id == bindparam("todo_id"))
+    .values(position=bindparam("new_position"), updated_at=Todo.__table__.c.updated_at)
+)
+
+# Per-user write lock on the user's shard: a no-op row update that API writes
+# and shard moves both take, so a move waits for in-flight writes to commit
+LOCK_USER_FOR_WRITE = (
+    update(User.__table__)
+    .where(User.__table__.c.id == bindparam("user_id"))
+    .values(updated_at=User.__table__.c.updated_at)
+)
+
+# Statements and placeholder parameters executed during worker warm-up
+DIRECTORY_WARMUP_STATEMENTS = [
+    (SELECT_DIRECTORY_ENTRY_BY_EMAIL, {"email": ""}),
+]
+
+WARMUP_STATEMENTS = [
+    (SELECT_TODOS_FOR_USER, {"user_id": 0}),
+    (SELECT_LAST_POSITION_FOR_USER, {"user_id": 0}),
+    (SELECT_TODO_BY_ID, {"todo_id": 0}),
+]
@@ -0,0 +1,118 @@
+"""
+Moving users between database shards.
+
+A move marks the user's directory entry as moving, which makes the API reject
+writes that read the directory with 503 while reads keep working. It then
+takes the user's write lock on the source shard. That waits for writes already
+routed there to commit, and holds back any that are still arriving. With the
+lock held it copies the user's rows to the target shard, repoints the
+directory and deletes the rows from the source shard. Requests still routed to
+the source shard (waiting writes, or workers with a cached route) find the
+user gone and look the directory up again.
+"""
+
+from sqlalchemy import delete, select
+
+from app.database.database import SessionLocal, get_shard_session, is_primary_shard, shard_engines
+from app.database.models import Todo, User, UserDirectory, UserTodoDailyStats, UserTodoStats
+from app.database.queries import LOCK_USER_FOR_WRITE
+
+
+def _row_values(obj) -> dict:
+    """Copy an ORM row's column values."""
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def _delete_user_rows(db, user_id: int) -> None:
+    """Delete a user and everything they own from one shard."""
+    db.execute(delete(Todo).where(Todo.user_id == user_id))
+    db.execute(delete(UserTodoDailyStats).where(UserTodoDailyStats.user_id == user_id))
+    db.execute(delete(UserTodoStats).where(UserTodoStats.user_id == user_id))
+    db.execute(delete(User).where(User.id == user_id))
+
+
+def _copy_user(source, user_id: int, target_shard: int) -> int:
+    """Copy a user's rows from the source session to the target shard and return the todo count."""
+    target = get_shard_session(target_shard)
+    try:
+        user = source.get(User, user_id)
+        todos = source.scalars(select(Todo).where(Todo.user_id == user_id).order_by(Todo.id)).all()
+        stats = source.get(UserTodoStats, user_id)
+        daily = source.scalars(
+            select(UserTodoDailyStats).where(UserTodoDailyStats.user_id == user_id)
+        ).all()
+
+        # Clear leftovers from an earlier interrupted move before copying
+        _delete_user_rows(target, user_id)
+        target.add(User(**_row_values(user)))
+        target.flush()
+
+        # Todo ids are allocated globally, so they are kept as they are
+        target.add_all(Todo(**_row_values(todo)) for todo in todos)
+        if stats is not None:
+            target.add(UserTodoStats(**_row_values(stats)))
+        target.add_all(UserTodoDailyStats(**_row_values(row)) for row in daily)
+
+        target.commit()
+        return len(todos)
+    except Exception:
+        target.rollback()
+        raise
+    finally:
+        target.close()
+
+
+def move_user(email: str, target_shard: int) -> bool:
+    """
+    Move a user and their todos to another shard while the API stays online.
+    Returns False if the user already lives on the target shard.
+    """
+    if not 0 <= target_shard < len(shard_engines):
+        raise ValueError(f"Unknown database shard: {target_shard}")
+
+    directory = SessionLocal()
+    # The primary shard shares the directory's database, and so its session
+    source = None
+    try:
+        entry = directory.scalars(
+            select(UserDirectory).where(UserDirectory.email == email).with_for_update()
+        ).first()
+        if entry is None:
+            raise ValueError(f"User not found: {email}")
+        if entry.moving:
+            raise RuntimeError(f"User {email} is already being moved")
+        if entry.shard == target_shard:
+            return False
+
+        user_id = entry.user_id
+        source_shard = entry.shard
+        entry.moving = True
+        directory.commit()
+
+        source = directory if is_primary_shard(source_shard) else get_shard_session(source_shard)
+        try:
+            # Waits for writes that were routed before the flag was set
+            if source.execute(LOCK_USER_FOR_WRITE, {"user_id": user_id}).rowcount == 0:
+                raise ValueError(f"User {user_id} not found on shard {source_shard}")
+            _copy_user(source, user_id, target_shard)
+
+            entry.shard = target_shard
+            entry.moving = False
+            if source is not directory:
+                directory.commit()
+
+            # Committing releases the lock; blocked writes then find no user here
+            _delete_user_rows(source, user_id)
+            source.commit()
+        except Exception:
+            source.rollback()
+            directory.rollback()
+            entry.moving = False
+            directory.commit()
+            raise
+    finally:
+        if source is not None and source is not directory:
+            source.close()
+        directory.close()
+
+    return True
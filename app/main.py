@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+import logging
 import sys
 
 # Load environment variables
@@ -8,11 +9,25 @@ load_dotenv()
 
 # Import settings
 from app.config import settings
+from app.utils.structured_logging import RequestLoggingMiddleware, setup_logging
+
+# Configure non-blocking JSON logging before anything else logs
+setup_logging(settings.log_level)
+logger = logging.getLogger(__name__)
 
 # Import routers
 from app.auth.auth import router as auth_router
 from app.todos.crud import router as todos_router
-from app.database.database import engine, test_db_connection
+from app.admin.profiling import profiler, router as profiling_router
+from app.utils.profiling import ProfilingMiddleware
+from app.database.database import (
+    engine,
+    shard_engines,
+    test_db_connection,
+    verify_shard_directory,
+    warm_up_database,
+)
+from app.database.id_allocator import sync_todo_ids
 
 app = FastAPI(
     title="Todo Web Application API",
@@ -32,26 +47,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add on-demand request profiling (a single flag check when not armed)
+app.add_middleware(ProfilingMiddleware, controller=profiler)
+
+# Add request id / access log middleware (outermost, so latency covers everything)
+app.add_middleware(RequestLoggingMiddleware, sample_rate=settings.log_sample_rate)
+
 # Create database tables
 @app.on_event("startup")
 def startup_event():
     # Test database connectivity
-    if not test_db_connection():
-        print("Warning: Unable to connect to the database. Please check your DATABASE_URL configuration.")
+    db_connected = test_db_connection()
+    if not db_connected:
+        logger.warning("Unable to connect to the database. Please check your DATABASE_URL configuration.")
         # Don't exit the application, just log the error
     else:
-        print("Database connectivity test passed.")
+        logger.info("Database connectivity test passed.")
 
     # Only create tables if not using PostgreSQL in production
     # In production, migrations should handle table creation
     if settings.environment != "production":
         from app.database.models import Base
         Base.metadata.create_all(bind=engine)
-        print("Database tables created.")
+        for shard_engine in shard_engines:
+            if shard_engine is not engine:
+                Base.metadata.create_all(bind=shard_engine)
+        logger.info("Database tables created.")
+
+    # Refuse to start if the directory routes users to shards that don't hold them
+    if db_connected:
+        verify_shard_directory()
+
+    # Todo ids are global across shards; never hand out one already in use
+    try:
+        sync_todo_ids()
+    except Exception as e:
+        logger.error("Unable to sync the todo id allocator: %s", e)
+
+    # Pre-open pooled connections and compile hot queries for this worker
+    if settings.db_warmup_connections > 0:
+        if warm_up_database(settings.db_warmup_connections):
+            logger.info("Database warm-up completed (%s connections).", settings.db_warmup_connections)
 
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(todos_router, prefix="/todos", tags=["Todos"])
+app.include_router(profiling_router, prefix="/admin/profiling", tags=["Admin"])
 
 @app.get("/")
 def read_root():
@@ -1,46 +1,191 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
 from typing import List
 
-from app.database.database import get_db
-from app.database.models import Todo, User
-from app.utils.security import get_current_user
-from app.utils.schemas import TodoCreate, TodoUpdate, TodoResponse
+from app.config import settings
+from app.database.id_allocator import todo_ids
+from app.database.models import Todo, User, UserDirectory, UserTodoStats
+from app.database.queries import (
+    LOCK_USER_FOR_WRITE,
+    SELECT_DAILY_STATS_FOR_USER,
+    SELECT_LAST_POSITION_FOR_USER,
+    SELECT_NEXT_POSITION,
+    SELECT_PREVIOUS_POSITION,
+    SELECT_TODOS_FOR_USER,
+    SELECT_TODO_BY_ID,
+    UPDATE_TODO_POSITION,
+)
+from app.todos.stats import record_todo_created, record_todo_deleted, set_todo_completed
+from app.utils.fractional_index import evenly_spaced_keys, key_between
+from app.utils.security import get_current_directory_entry, get_current_user, get_user_db
+from app.utils.schemas import TodoCreate, TodoMove, TodoUpdate, TodoResponse, TodoDailyStats, TodoStatsResponse
+from app.utils.single_flight import SingleFlight
 
 router = APIRouter()
 
+# Shares one query between concurrent identical todo list reads in this worker
+todo_reads = SingleFlight()
+
+# Positions are unique per user; a write that loses a race for a key retries
+POSITION_WRITE_ATTEMPTS = 3
+
+
+def position_conflict() -> HTTPException:
+    """Error for a position write that kept losing races for its key."""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="The list was changed concurrently, please retry"
+    )
+
+
+def invalidate_todo_reads(user_id: int) -> None:
+    """Stop sharing in-flight todo list reads for a user after a write."""
+    todo_reads.invalidate(lambda key: key[1] == user_id)
+
+
+def rebalance_todo_positions(user_id: int, bind) -> None:
+    """Rewrite a user's position keys as short, evenly spaced keys."""
+    db = Session(bind=bind)
+    try:
+        # Take the same per-user lock as API writes, so a move computed from
+        # the old keys can't land in the middle of the rewrite
+        if db.execute(LOCK_USER_FOR_WRITE, {"user_id": user_id}).rowcount == 0:
+            # The user moved to another shard since the rebalance was queued
+            return
+
+        todos = db.scalars(SELECT_TODOS_FOR_USER, {"user_id": user_id}).all()
+        if todos:
+            keys = evenly_spaced_keys(len(todos))
+            # Park every row on a temporary key first so no intermediate
+            # state breaks the unique (user_id, position) index
+            db.execute(
+                UPDATE_TODO_POSITION,
+                [{"todo_id": todo.id, "new_position": f"~{todo.id}"} for todo in todos],
+            )
+            db.execute(
+                UPDATE_TODO_POSITION,
+                [
+                    {"todo_id": todo.id, "new_position": key}
+                    for todo, key in zip(todos, keys)
+                ],
+            )
+            db.commit()
+    finally:
+        db.close()
+
+    invalidate_todo_reads(user_id)
+
+
+def schedule_rebalance_if_needed(
+    position: str, user_id: int, db: Session, background_tasks: BackgroundTasks
+) -> None:
+    """Queue a background rebalance once a position key grows too long."""
+    if len(position) > settings.position_rebalance_length:
+        # Rebalance on the same shard the user's todos were written to
+        background_tasks.add_task(rebalance_todo_positions, user_id, db.get_bind())
+
+
+def reserve_todo_id(
+    todo_data: TodoCreate,
+    entry: UserDirectory = Depends(get_current_directory_entry)
+) -> int:
+    """
+    Allocate the id of a todo about to be created. Taking the body and the
+    directory entry means ids are only spent on authenticated, valid requests.
+    """
+    return todo_ids.allocate()
+
 
 @router.post("/", response_model=TodoResponse)
 def create_todo(
     todo_data: TodoCreate,
+    background_tasks: BackgroundTasks,
+    # Declared before the user's session: reserving a new block of ids writes to
+    # the primary, which SQLite can't do while get_user_db holds the write lock
+    todo_id: int = Depends(reserve_todo_id),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     """Create a new todo for the authenticated user."""
-    # Create the new todo
-    db_todo = Todo(
-        title=todo_data.title,
-        description=todo_data.description,
-        completed=todo_data.completed,
-        user_id=current_user.id
-    )
+    now = datetime.utcnow()
+    for _ in range(POSITION_WRITE_ATTEMPTS):
+        # New todos go to the end of the user's list
+        last_position = db.scalar(SELECT_LAST_POSITION_FOR_USER, {"user_id": current_user.id})
+        position = key_between(last_position, None)
 
-    db.add(db_todo)
-    db.commit()
+        # Create the new todo
+        db_todo = Todo(
+            id=todo_id,
+            title=todo_data.title,
+            description=todo_data.description,
+            completed=todo_data.completed,
+            created_at=now,
+            completed_at=now if todo_data.completed else None,
+            user_id=current_user.id,
+            position=position
+        )
+
+        db.add(db_todo)
+        try:
+            db.flush()
+            record_todo_created(db, db_todo)
+            db.commit()
+            break
+        except IntegrityError:
+            # A concurrent create took the same key; append after it instead
+            db.rollback()
+    else:
+        raise position_conflict()
+
+    invalidate_todo_reads(current_user.id)
     db.refresh(db_todo)
 
+    schedule_rebalance_if_needed(position, current_user.id, db, background_tasks)
+
     return db_todo
 
 
 @router.get("/", response_model=List[TodoResponse])
 def get_todos(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     """Get all todos for the authenticated user."""
-    todos = db.query(Todo).filter(Todo.user_id == current_user.id).order_by(Todo.id).all()
-    return todos
+    def load_todos():
+        todos = db.scalars(SELECT_TODOS_FOR_USER, {"user_id": current_user.id}).all()
+        return [TodoResponse.model_validate(todo) for todo in todos]
+
+    return todo_reads.do(("todos", current_user.id), load_todos)
+
+
+@router.get("/stats", response_model=TodoStatsResponse)
+def get_todo_stats(
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_db)
+):
+    """Get todo counters for the authenticated user without loading the todos."""
+    totals = db.get(UserTodoStats, current_user.id)
+    total = totals.total if totals else 0
+    completed = totals.completed if totals else 0
+
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    daily = db.scalars(
+        SELECT_DAILY_STATS_FOR_USER, {"user_id": current_user.id, "since": since}
+    ).all()
+
+    return TodoStatsResponse(
+        total=total,
+        completed=completed,
+        pending=total - completed,
+        daily=[
+            TodoDailyStats(day=row.day, created=row.created, completed=row.completed)
+            for row in daily
+        ]
+    )
 
 
 @router.put("/{todo_id}", response_model=TodoResponse)
@@ -48,11 +193,11 @@ def update_todo(
     todo_id: int,
     todo_data: TodoUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     """Update a specific todo for the authenticated user."""
     # Get the todo
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    db_todo = db.scalars(SELECT_TODO_BY_ID, {"todo_id": todo_id}).first()
 
     # Check if todo exists and belongs to the current user
     if not db_todo:
@@ -73,9 +218,10 @@ def update_todo(
     if todo_data.description is not None:
         db_todo.description = todo_data.description
     if todo_data.completed is not None:
-        db_todo.completed = todo_data.completed
+        set_todo_completed(db, db_todo, todo_data.completed)
 
     db.commit()
+    invalidate_todo_reads(current_user.id)
     db.refresh(db_todo)
 
     return db_todo
@@ -86,11 +232,11 @@ def update_todo(
 def delete_todo(
     todo_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     """Delete a specific todo for the authenticated user."""
     # Get the todo
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    db_todo = db.scalars(SELECT_TODO_BY_ID, {"todo_id": todo_id}).first()
 
     # Check if todo exists and belongs to the current user
     if not db_todo:
@@ -107,7 +253,9 @@ def delete_todo(
 
     # Delete the todo
     db.delete(db_todo)
+    record_todo_deleted(db, db_todo)
     db.commit()
+    invalidate_todo_reads(current_user.id)
 
     return {"message": "Todo deleted successfully"}
 
@@ -116,11 +264,11 @@ def delete_todo(
 def toggle_todo_completion(
     todo_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     """Toggle the completion status of a specific todo for the authenticated user."""
     # Get the todo
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    db_todo = db.scalars(SELECT_TODO_BY_ID, {"todo_id": todo_id}).first()
 
     # Check if todo exists and belongs to the current user
     if not db_todo:
@@ -136,9 +284,77 @@ def toggle_todo_completion(
         )
 
     # Toggle the completion status
-    db_todo.completed = not db_todo.completed
+    set_todo_completed(db, db_todo, not db_todo.completed)
 
     db.commit()
+    invalidate_todo_reads(current_user.id)
     db.refresh(db_todo)
 
-    return db_todo
\ No newline at end of file
+    return db_todo
+
+
+@router.patch("/{todo_id}/move", response_model=TodoResponse)
+def move_todo(
+    todo_id: int,
+    move_data: TodoMove,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_db)
+):
+    """Move a todo directly before or after a sibling, updating only that todo."""
+    if (move_data.before_id is None) == (move_data.after_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of before_id or after_id"
+        )
+
+    anchor_id = move_data.before_id if move_data.before_id is not None else move_data.after_id
+    if anchor_id == todo_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A todo cannot be moved relative to itself"
+        )
+
+    # Get the todo and the sibling it is moved next to
+    db_todo = db.scalars(SELECT_TODO_BY_ID, {"todo_id": todo_id}).first()
+    anchor = db.scalars(SELECT_TODO_BY_ID, {"todo_id": anchor_id}).first()
+
+    # Check if both todos exist and belong to the current user
+    if not db_todo or not anchor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Todo not found"
+        )
+
+    if db_todo.user_id != current_user.id or anchor.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this todo"
+        )
+
+    for _ in range(POSITION_WRITE_ATTEMPTS):
+        # Find the neighbouring key on the other side of the sibling
+        params = {"user_id": current_user.id, "position": anchor.position, "todo_id": todo_id}
+        if move_data.before_id is not None:
+            lower = db.scalar(SELECT_PREVIOUS_POSITION, params)
+            upper = anchor.position
+        else:
+            lower = anchor.position
+            upper = db.scalar(SELECT_NEXT_POSITION, params)
+
+        db_todo.position = key_between(lower, upper)
+        try:
+            db.commit()
+            break
+        except IntegrityError:
+            # A concurrent move took the same key; recompute from fresh neighbours
+            db.rollback()
+    else:
+        raise position_conflict()
+
+    invalidate_todo_reads(current_user.id)
+    db.refresh(db_todo)
+
+    schedule_rebalance_if_needed(db_todo.position, current_user.id, db, background_tasks)
+
+    return db_todo
@@ -0,0 +1,158 @@
+"""
+Per-user todo counters.
+
+Counters are adjusted with atomic upserts inside the caller's transaction,
+so they commit or roll back together with the todo write they describe.
+"""
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database.models import Todo, UserTodoDailyStats, UserTodoStats
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _increment(db: Session, model, keys: dict, deltas: dict) -> None:
+    """Insert a counter row or add deltas to the existing one."""
+    table = model.__table__
+    insert = _DIALECT_INSERTS[db.get_bind().dialect.name]
+    statement = insert(table).values(**keys, **deltas)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: table.c[name] + statement.excluded[name] for name in deltas},
+    )
+    db.execute(statement)
+
+
+def record_todo_change(
+    db: Session,
+    user_id: int,
+    total: int = 0,
+    completed: int = 0,
+) -> None:
+    """Apply deltas to a user's total and completed counters."""
+    if total or completed:
+        _increment(
+            db,
+            UserTodoStats,
+            {"user_id": user_id},
+            {"total": total, "completed": completed},
+        )
+
+
+def record_daily_change(
+    db: Session,
+    user_id: int,
+    day: Optional[date],
+    created: int = 0,
+    completed: int = 0,
+) -> None:
+    """Apply deltas to a user's counters for one day (no day, no change)."""
+    if day is not None and (created or completed):
+        _increment(
+            db,
+            UserTodoDailyStats,
+            {"user_id": user_id, "day": day},
+            {"created": created, "completed": completed},
+        )
+
+
+def record_todo_created(db: Session, todo: Todo) -> None:
+    """Count a new todo; call after flushing it so created_at is loaded."""
+    record_todo_change(db, todo.user_id, total=1, completed=int(todo.completed))
+    record_daily_change(db, todo.user_id, _day_of(todo.created_at), created=1)
+    if todo.completed:
+        record_daily_change(db, todo.user_id, _day_of(todo.completed_at), completed=1)
+
+
+def record_todo_deleted(db: Session, todo: Todo) -> None:
+    """Remove a todo from the counters of the days it was created and completed."""
+    record_todo_change(db, todo.user_id, total=-1, completed=-int(todo.completed))
+    record_daily_change(db, todo.user_id, _day_of(todo.created_at), created=-1)
+    if todo.completed:
+        record_daily_change(db, todo.user_id, _day_of(todo.completed_at), completed=-1)
+
+
+def set_todo_completed(db: Session, todo: Todo, completed: bool) -> None:
+    """
+    Mark a todo completed or reopened and adjust the counters. Reopening
+    takes the completion back off the day it was recorded on.
+    """
+    if todo.completed == completed:
+        return
+
+    if completed:
+        todo.completed_at = datetime.utcnow()
+        record_daily_change(db, todo.user_id, todo.completed_at.date(), completed=1)
+    else:
+        record_daily_change(db, todo.user_id, _day_of(todo.completed_at), completed=-1)
+        todo.completed_at = None
+
+    todo.completed = completed
+    record_todo_change(db, todo.user_id, completed=1 if completed else -1)
+
+
+def rebuild_todo_stats(db: Session) -> int:
+    """
+    Recompute every counter from the todos table and return the number of
+    users rebuilt. Per-day counts cover todos that still exist: created by
+    created_at, and completed by completed_at for todos still completed,
+    matching what the incremental updates maintain.
+    """
+    db.execute(delete(UserTodoDailyStats))
+    db.execute(delete(UserTodoStats))
+
+    totals = db.execute(
+        select(
+            Todo.user_id,
+            func.count(Todo.id),
+            func.coalesce(func.sum(case((Todo.completed.is_(True), 1), else_=0)), 0),
+        ).group_by(Todo.user_id)
+    ).all()
+    for user_id, total, completed in totals:
+        db.add(UserTodoStats(user_id=user_id, total=total, completed=completed))
+
+    daily = {}
+    created_day = func.date(Todo.created_at)
+    for user_id, day, count in db.execute(
+        select(Todo.user_id, created_day, func.count(Todo.id))
+        .where(Todo.created_at.is_not(None))
+        .group_by(Todo.user_id, created_day)
+    ):
+        daily.setdefault((user_id, _as_date(day)), [0, 0])[0] += count
+
+    completed_day = func.date(Todo.completed_at)
+    for user_id, day, count in db.execute(
+        select(Todo.user_id, completed_day, func.count(Todo.id))
+        .where(Todo.completed.is_(True), Todo.completed_at.is_not(None))
+        .group_by(Todo.user_id, completed_day)
+    ):
+        daily.setdefault((user_id, _as_date(day)), [0, 0])[1] += count
+
+    for (user_id, day), (created, completed) in daily.items():
+        db.add(UserTodoDailyStats(user_id=user_id, day=day, created=created, completed=completed))
+
+    db.commit()
+    return len(totals)
+
+
+def _day_of(value: Optional[datetime]) -> Optional[date]:
+    """Counter day for a stored timestamp; rows without one aren't counted per day."""
+    return value.date() if value is not None else None
+
+
+def _as_date(value) -> date:
+    """Normalise date() results, which SQLite returns as ISO strings."""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
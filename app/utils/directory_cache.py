@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class DirectoryCache:
+    """
+    Bounded LRU cache of user directory routes (email and shard), keyed by
+    user id. Entries can go stale when a user moves shards, so callers must
+    drop and re-fetch an entry once the user is missing from its shard.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Tuple[str, int]]:
+        """Return the cached (email, shard) for a user, or None."""
+        if self.max_size <= 0:
+            return None
+
+        with self._lock:
+            route = self._entries.get(user_id)
+            if route is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return route
+
+    def set(self, user_id: int, email: str, shard: int) -> None:
+        """Remember where a user lives."""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[user_id] = (email, shard)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id: int) -> None:
+        """Forget a user's route, e.g. after finding them gone from its shard."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Drop all cached entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Return cache size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
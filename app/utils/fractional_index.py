@@ -0,0 +1,75 @@
+"""
+Fractional index keys for user-defined ordering.
+
+Keys are strings over base-36 digits that sort lexicographically, so a new
+key can always be generated between two neighbours without touching any
+other row. Only lowercase letters and digits are used so the ordering is
+the same under byte-wise and locale-aware database collations.
+"""
+
+from typing import List, Optional
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """Return a key strictly between a and b (b=None means unbounded)."""
+    if b is not None:
+        # Carry over the shared prefix, treating missing digits in a as "0"
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+
+    # Neighbouring first digits: extend past a
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(a: Optional[str], b: Optional[str]) -> str:
+    """
+    Generate a key that sorts after a and before b.
+    Pass None for a to insert at the start, or None for b to append.
+    """
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"Invalid key range: {a!r} must sort before {b!r}")
+
+    # Appending is the common case: bump the last digit instead of halving the
+    # remaining space so keys only grow by one digit about every BASE appends
+    if a and b is None:
+        last = DIGITS.index(a[-1])
+        if last < BASE - 1:
+            return a[:-1] + DIGITS[last + 1]
+        return a + DIGITS[1]
+
+    return _midpoint(a or "", b)
+
+
+def evenly_spaced_keys(count: int) -> List[str]:
+    """Generate count short ascending keys spread evenly over the key space."""
+    if count <= 0:
+        return []
+
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    step = BASE ** width // (count + 1)
+
+    keys = []
+    for i in range(1, count + 1):
+        value = step * i
+        digits = []
+        for _ in range(width):
+            value, remainder = divmod(value, BASE)
+            digits.append(DIGITS[remainder])
+        # Trailing zeros don't change the ordering and would block key_between
+        keys.append("".join(reversed(digits)).rstrip(DIGITS[0]))
+    return keys
@@ -0,0 +1,259 @@
+"""
+On-demand request profiling.
+
+While a request is profiled, a background thread samples the stacks of the
+threads working on that request (the event loop, and threadpool workers from
+the first database statement they run for it) and counts them in collapsed
+("frame;frame;frame count") form, which flamegraph.pl and speedscope read
+directly. Profiles are written to a bounded ring of files on disk.
+
+When nothing is armed the middleware only checks a single boolean and no
+thread tracking hooks are installed.
+"""
+
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.routing import Match
+
+from app.utils.structured_logging import current_request_id
+
+# Stacks are kept only if they pass through code in the app package
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+# Idents of the threads working on the profiled request (shared with threadpool
+# workers through the request's context; the set is mutated, not replaced)
+_profiled_threads: ContextVar[Optional[Set[int]]] = ContextVar("profiled_threads", default=None)
+
+
+def _record_profiled_thread(orm_execute_state=None) -> None:
+    threads = _profiled_threads.get()
+    if threads is not None:
+        threads.add(threading.get_ident())
+
+
+def _track_request_threads(enabled: bool) -> None:
+    """
+    Install or remove the session hook that records which threadpool threads
+    work on the profiled request. Endpoints and dependencies run on arbitrary
+    workers, and each statement they send through a session names its thread.
+    """
+    installed = event.contains(Session, "do_orm_execute", _record_profiled_thread)
+    if enabled and not installed:
+        event.listen(Session, "do_orm_execute", _record_profiled_thread)
+    elif not enabled and installed:
+        event.remove(Session, "do_orm_execute", _record_profiled_thread)
+
+
+class StackSampler:
+    """Statistical profiler sampling the given threads' stacks at a fixed interval."""
+
+    def __init__(self, interval: float, threads: Set[int]):
+        self.interval = interval
+        # Live set: threads added while sampling are picked up on the next tick
+        self.threads = threads
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """Stop sampling and return the collapsed stack counts."""
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in self.threads:
+                    continue
+
+                stack = []
+                in_app = False
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename != _THIS_FILE:
+                        if code.co_filename.startswith(APP_DIR):
+                            in_app = True
+                        stack.append(
+                            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                        )
+                    frame = frame.f_back
+
+                if in_app:
+                    self.samples[";".join(reversed(stack))] += 1
+
+
+class ProfileRing:
+    """Bounded on-disk ring of collapsed-stack profiles."""
+
+    def __init__(self, directory: str, size: int):
+        self.directory = directory
+        self.size = size
+        self._lock = threading.Lock()
+
+    def save(self, route: str, request_id: str, samples: Counter) -> str:
+        """Write a profile, drop the oldest beyond the ring size, and return its name."""
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{request_id[:12]}.folded"
+        lines = [f"{stack} {count}" for stack, count in samples.most_common()]
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name), "w") as f:
+                f.write("\n".join(lines) + "\n")
+
+            for old_name in self.list()[self.size:]:
+                try:
+                    os.remove(os.path.join(self.directory, old_name))
+                except FileNotFoundError:
+                    # Another worker sharing the directory trimmed it first
+                    pass
+
+        return name
+
+    def list(self) -> List[str]:
+        """Profile names, newest first."""
+        # Other workers sharing the directory may delete files at any point
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".folded")]
+        except FileNotFoundError:
+            return []
+
+        modified = {}
+        for name in names:
+            try:
+                modified[name] = os.path.getmtime(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+        return sorted(modified, key=modified.get, reverse=True)
+
+    def read(self, name: str) -> Optional[str]:
+        """Return a stored profile, or None if it doesn't exist."""
+        if name not in self.list():
+            return None
+        try:
+            with open(os.path.join(self.directory, name)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class ProfilingController:
+    """Per-worker profiling switches: the next N requests and per-route sample rates."""
+
+    def __init__(self, ring: ProfileRing, interval: float):
+        self.ring = ring
+        self.interval = interval
+        self.remaining_requests = 0
+        self.route_rates: Dict[str, float] = {}
+        # The only thing the middleware reads when profiling is off
+        self.enabled = False
+        self._busy = False
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        self.enabled = self.remaining_requests > 0 or bool(self.route_rates)
+        # Keep tracking threads until the last claimed profile is finished
+        _track_request_threads(self.enabled or self._busy)
+
+    def profile_next(self, requests: int) -> None:
+        with self._lock:
+            self.remaining_requests = max(requests, 0)
+            self._refresh()
+
+    def set_route_rate(self, route: str, rate: float) -> None:
+        with self._lock:
+            if rate > 0:
+                self.route_rates[route] = min(rate, 1.0)
+            else:
+                self.route_rates.pop(route, None)
+            self._refresh()
+
+    def disable(self) -> None:
+        with self._lock:
+            self.remaining_requests = 0
+            self.route_rates.clear()
+            self._refresh()
+
+    def status(self) -> dict:
+        return {
+            "worker_pid": os.getpid(),
+            "enabled": self.enabled,
+            "remaining_requests": self.remaining_requests,
+            "route_rates": dict(self.route_rates),
+            "profiles": self.ring.list(),
+        }
+
+    def claim(self, route: Optional[str]) -> bool:
+        """Decide whether to profile this request; one profile runs at a time."""
+        with self._lock:
+            if self._busy:
+                return False
+            if self.remaining_requests > 0:
+                self.remaining_requests -= 1
+            elif route is None or random.random() >= self.route_rates.get(route, 0.0):
+                return False
+            self._busy = True
+            self._refresh()
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._busy = False
+            self._refresh()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests selected by the controller."""
+
+    def __init__(self, app, controller: ProfilingController):
+        self.app = app
+        self.controller = controller
+
+    def _route_for(self, scope) -> Optional[str]:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if not self.controller.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route_for(scope) if self.controller.route_rates else None
+        if not self.controller.claim(route):
+            await self.app(scope, receive, send)
+            return
+
+        # Sample the event loop thread, plus threadpool threads as they join
+        threads = {threading.get_ident()}
+        token = _profiled_threads.set(threads)
+        sampler = StackSampler(self.controller.interval, threads)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            samples = sampler.stop()
+            _profiled_threads.reset(token)
+            self.controller.release()
+            if samples:
+                self.controller.ring.save(
+                    route or scope["path"], current_request_id() or uuid.uuid4().hex, samples
+                )
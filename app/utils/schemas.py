@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 
 
 class UserCreate(BaseModel):
@@ -32,11 +32,31 @@ class TodoUpdate(BaseModel):
     completed: Optional[bool] = None
 
 
+class TodoMove(BaseModel):
+    before_id: Optional[int] = None
+    after_id: Optional[int] = None
+
+
 class TodoResponse(TodoBase):
     id: int
     user_id: int
+    position: str
     created_at: datetime
     updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class TodoDailyStats(BaseModel):
+    day: date
+    created: int
+    completed: int
+
+
+class TodoStatsResponse(BaseModel):
+    total: int
+    completed: int
+    pending: int
+    daily: List[TodoDailyStats]
@@ -2,11 +2,16 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from app.database.database import get_db
-from app.database.models import User
+from app.config import settings
+from app.database.database import get_db, get_shard_session, is_primary_shard
+from app.database.models import User, UserDirectory
+from app.database.queries import LOCK_USER_FOR_WRITE, SELECT_DIRECTORY_ENTRY_BY_EMAIL
+from app.utils.directory_cache import DirectoryCache
+from app.utils.token_cache import TokenCache
 from dotenv import load_dotenv
 import os
 
@@ -24,6 +29,14 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Per-process cache of verified token claims (0 disables caching)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "1024"))
+token_cache = TokenCache(max_size=JWT_CACHE_SIZE)
+
+# Per-process cache of user id -> shard routes, so requests skip the directory
+DIRECTORY_CACHE_SIZE = int(os.getenv("DIRECTORY_CACHE_SIZE", "10000"))
+directory_cache = DirectoryCache(max_size=DIRECTORY_CACHE_SIZE)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
@@ -37,9 +50,26 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(truncated_password)
 
 
+def get_directory_entry(db: Session, email: str) -> Optional[UserDirectory]:
+    """Look up a user's id and shard in the global directory."""
+    return db.scalars(SELECT_DIRECTORY_ENTRY_BY_EMAIL, {"email": email}).first()
+
+
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     """Authenticate user by email and password."""
-    user = db.query(User).filter(User.email == email).first()
+    entry = get_directory_entry(db, email)
+    if not entry:
+        return None
+
+    if is_primary_shard(entry.shard):
+        user = db.get(User, entry.user_id)
+    else:
+        shard_db = get_shard_session(entry.shard)
+        try:
+            user = shard_db.get(User, entry.user_id)
+        finally:
+            shard_db.close()
+
     if not user:
         return None
     if not verify_password(password, user.hashed_password):
@@ -60,27 +90,167 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_current_user(
+def get_current_directory_entry(
     token: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
-    """Get the current user from the JWT token."""
+) -> UserDirectory:
+    """
+    Resolve the JWT token to the user's directory entry. Tokens carry the
+    user id, so known users are routed from the per-process cache without
+    touching the directory; get_user_db re-checks routes that went stale.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    # Skip signature verification for tokens already verified and not yet expired
+    payload = token_cache.get(token.credentials)
+    if payload is None:
+        try:
+            payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        token_cache.set(token.credentials, payload)
+
+    email: str = payload.get("sub")
+    if email is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    # Tokens issued before the uid claim was added always use the directory
+    user_id = payload.get("uid")
+    route = directory_cache.get(user_id) if user_id is not None else None
+    if route is not None:
+        return UserDirectory(user_id=user_id, email=route[0], shard=route[1], moving=False)
+
+    entry = get_directory_entry(db, email)
+    if entry is None or (user_id is not None and entry.user_id != user_id):
         raise credentials_exception
+    if not entry.moving:
+        directory_cache.set(entry.user_id, entry.email, entry.shard)
+
+    return entry
+
+
+def account_moving_exception() -> HTTPException:
+    """Tell the client to retry a write once the user's shard move is done."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Account is being migrated, please retry shortly",
+        headers={"Retry-After": "5"},
+    )
+
+
+def lock_user_for_writes(db: Session, user_id: int) -> None:
+    """
+    Take the user's write lock on their shard now and at the start of every
+    later transaction on this session. Shard moves take the same lock, so a
+    write either commits before the move copies the user or finds the user
+    gone from this shard afterwards.
+    """
+    def take_lock(session, transaction, connection):
+        if connection.execute(LOCK_USER_FOR_WRITE, {"user_id": user_id}).rowcount == 0:
+            # Moved to another shard while this request was being routed
+            raise account_moving_exception()
+
+    # Lock now, before installing the listener, so a user who isn't on this
+    # shard leaves the session as it was apart from the open transaction
+    take_lock(db, None, db.connection())
+    event.listen(db, "after_begin", take_lock)
+
+
+def _open_user_session(entry: UserDirectory, directory_db: Session, is_write: bool) -> Optional[Session]:
+    """
+    Open a session on the entry's shard, locked for writes, or return None if
+    the user isn't stored there (anymore).
+    """
+    # Fail fast instead of queueing behind a move that is copying the user
+    if entry.moving and is_write:
+        raise account_moving_exception()
+
+    # Unsharded setups reuse the request's primary session
+    db = directory_db if is_primary_shard(entry.shard) else get_shard_session(entry.shard)
+    try:
+        if is_write:
+            # The write lock doubles as the check that the user lives here
+            try:
+                lock_user_for_writes(db, entry.user_id)
+                return db
+            except HTTPException:
+                pass
+        elif db.get(User, entry.user_id) is not None:
+            return db
+
+        db.rollback()
+    except Exception:
+        if db is not directory_db:
+            db.close()
+        raise
+
+    if db is not directory_db:
+        db.close()
+    return None
+
+
+def get_user_db(
+    request: Request,
+    entry: UserDirectory = Depends(get_current_directory_entry),
+    directory_db: Session = Depends(get_db)
+):
+    """
+    Dependency to get a session on the authenticated user's shard. Routes
+    usually come from the per-process cache; only when the user is missing
+    from the cached shard is the directory consulted again.
+    """
+    is_write = request.method not in ("GET", "HEAD", "OPTIONS")
+
+    db = _open_user_session(entry, directory_db, is_write)
+    if db is None:
+        # Moved since the route was cached (or mid-move): ask the directory
+        directory_cache.discard(entry.user_id)
+        entry = get_directory_entry(directory_db, entry.email)
+        if entry is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        db = _open_user_session(entry, directory_db, is_write)
+        if db is None:
+            raise account_moving_exception()
+        if not entry.moving:
+            directory_cache.set(entry.user_id, entry.email, entry.shard)
+
+    try:
+        yield db
+    finally:
+        if db is not directory_db:
+            db.close()
+
+
+def get_current_user(
+    entry: UserDirectory = Depends(get_current_directory_entry),
+    db: Session = Depends(get_user_db)
+) -> User:
+    """Get the current user from the JWT token."""
+    user = db.get(User, entry.user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return user
+
+
+def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    """Allow only users listed in ADMIN_EMAILS."""
+    if current_user.email not in settings.admin_emails:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
 
-    return user
\ No newline at end of file
+    return current_user
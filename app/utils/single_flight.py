@@ -0,0 +1,61 @@
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    """A single in-flight execution shared by concurrent callers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.stale = False
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls within a worker.
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result instead of running it again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn for key, or wait for and share an identical in-flight call."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            # A write landed while the shared call was running; don't reuse it
+            if call.stale:
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def invalidate(self, match: Callable[[Hashable], bool]) -> None:
+        """Detach in-flight calls whose key matches so later callers start fresh."""
+        with self._lock:
+            for key in [key for key in self._calls if match(key)]:
+                self._calls.pop(key).stale = True
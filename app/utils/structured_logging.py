@@ -0,0 +1,187 @@
+"""
+Non-blocking structured logging.
+
+Log records are pushed onto an in-memory queue by a QueueHandler and written
+as JSON lines by a QueueListener thread, so request threads never block on
+stdout. A pure ASGI middleware tags each request with an id and emits a
+sampled access log with route, latency and time spent in the database.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+# Per-request state shared with threadpool workers (the dict is mutated, not replaced)
+_request_state: ContextVar[Optional[dict]] = ContextVar("request_state", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RESERVED_ATTRS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+access_logger = logging.getLogger("app.access")
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        # Records from the queue carry their traceback pre-rendered in exc_text
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    QueueHandler that keeps tracebacks out of the message. The stdlib
+    prepare() formats the record, folding the traceback into msg; this one
+    only merges the args and renders the traceback into exc_text, so the
+    formatter on the listener side can emit it as a separate field.
+    """
+
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            # Tracebacks can't be pickled or outlive their frames; keep the text
+            if not record.exc_text:
+                record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request id to records logged during a request."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        state = _request_state.get()
+        if state is not None and not hasattr(record, "request_id"):
+            record.request_id = state["request_id"]
+        return True
+
+
+def current_request_id() -> Optional[str]:
+    """Return the id of the request being handled, if any."""
+    state = _request_state.get()
+    return state["request_id"] if state is not None else None
+
+
+def setup_logging(level: str = "INFO") -> None:
+    """Route all logging through a background queue listener writing JSON to stdout."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if _request_state.get() is not None:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    state = _request_state.get()
+    start_times = conn.info.get("query_start_times")
+    if state is not None and start_times:
+        state["db_ms"] += (time.perf_counter() - start_times.pop()) * 1000
+
+
+class RequestLoggingMiddleware:
+    """ASGI middleware that assigns request ids and logs sampled access lines."""
+
+    def __init__(self, app, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        state = {"request_id": request_id, "db_ms": 0.0}
+        token = _request_state.set(state)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            latency_ms = (time.perf_counter() - start) * 1000
+            _request_state.reset(token)
+
+            # Server errors are always logged; everything else is sampled
+            if status_code >= 500 or random.random() < self.sample_rate:
+                route = scope.get("route")
+                access_logger.info(
+                    "request completed",
+                    extra={
+                        "request_id": request_id,
+                        "method": scope["method"],
+                        "route": route.path if route is not None else scope["path"],
+                        "status": status_code,
+                        "latency_ms": round(latency_ms, 2),
+                        "db_ms": round(state["db_ms"], 2),
+                    },
+                )
@@ -0,0 +1,64 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against throwaway SQLite databases, so the environment has to
+be configured before anything under app/ is imported (the engines and settings
+are created at import time).
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "benchmark-password"
+
+
+def configure_environment(work_dir: str = None, **overrides) -> str:
+    """Point the app at a SQLite database in work_dir and return the directory."""
+    work_dir = work_dir or tempfile.mkdtemp(prefix="todo-bench-")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+        "SECRET_KEY": "benchmark-secret-key",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "ENVIRONMENT": "development",
+        "LOG_LEVEL": "WARNING",
+        "PROFILE_DIR": os.path.join(work_dir, "profiles"),
+    })
+    os.environ.update({name: str(value) for name, value in overrides.items()})
+    return work_dir
+
+
+def create_user_with_todos(client, todos: int = 20) -> dict:
+    """Sign up the benchmark user, add some todos and return auth headers."""
+    client.post("/auth/signup", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    response = client.post("/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for i in range(todos):
+        client.post("/todos/", json={"title": f"Todo {i}"}, headers=headers).raise_for_status()
+    return headers
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(latencies_ms) -> str:
+    """One-line mean/p50/p99/max summary of latencies in milliseconds."""
+    return (
+        f"mean {statistics.mean(latencies_ms):7.3f} ms  "
+        f"p50 {percentile(latencies_ms, 50):7.3f} ms  "
+        f"p99 {percentile(latencies_ms, 99):7.3f} ms  "
+        f"max {max(latencies_ms):7.3f} ms"
+    )
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Request latency with and without the structured logging pipeline.
+
+Compares authenticated GET /todos/ requests through TestClient with:
+  - no RequestLoggingMiddleware and no DB-time cursor listeners
+  - the middleware and listeners at LOG_SAMPLE_RATE 1.0 and 0.1
+Access lines are written by the real queue listener, pointed at /dev/null.
+
+Usage:
+    python benchmarks/logging_overhead.py [--requests 500] [--rounds 6]
+"""
+
+import argparse
+import os
+import time
+
+from common import configure_environment, create_user_with_todos, summarize
+
+VARIANTS = ("no logging", "sample rate 1.0", "sample rate 0.1")
+
+
+def configure_variant(app, logging_middleware, variant, structured_logging, event, Engine) -> None:
+    """Rebuild the app's middleware stack and cursor listeners for one variant."""
+    listeners = (
+        ("before_cursor_execute", structured_logging._start_query_timer),
+        ("after_cursor_execute", structured_logging._stop_query_timer),
+    )
+    for name, listener in listeners:
+        if event.contains(Engine, name, listener):
+            event.remove(Engine, name, listener)
+
+    app.user_middleware = [m for m in app.user_middleware if m is not logging_middleware]
+    if variant != "no logging":
+        logging_middleware.options["sample_rate"] = float(variant.split()[-1])
+        app.user_middleware.insert(0, logging_middleware)
+        for name, listener in listeners:
+            event.listen(Engine, name, listener)
+
+    app.middleware_stack = app.build_middleware_stack()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=6)
+    args = parser.parse_args()
+
+    configure_environment(LOG_LEVEL="INFO", DB_WARMUP_CONNECTIONS=4)
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app.main import app
+    from app.utils import structured_logging
+
+    # Keep the real queue listener thread, but write its output nowhere
+    structured_logging._listener.handlers[0].setStream(open(os.devnull, "w"))
+    logging_middleware = next(
+        m for m in app.user_middleware if m.cls is structured_logging.RequestLoggingMiddleware
+    )
+
+    latencies = {variant: [] for variant in VARIANTS}
+    with TestClient(app) as client:
+        headers = create_user_with_todos(client)
+        for _ in range(args.rounds):
+            # Interleave the variants so they share the same machine noise
+            for variant in VARIANTS:
+                configure_variant(app, logging_middleware, variant, structured_logging, event, Engine)
+                client.get("/todos/", headers=headers).raise_for_status()
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    response = client.get("/todos/", headers=headers)
+                    latencies[variant].append((time.perf_counter() - start) * 1000)
+                    response.raise_for_status()
+
+    baseline = sum(latencies["no logging"]) / len(latencies["no logging"])
+    print(f"{args.rounds} rounds x {args.requests} GET /todos/ requests per variant")
+    for variant in VARIANTS:
+        mean = sum(latencies[variant]) / len(latencies[variant])
+        print(f"{variant:16s} {summarize(latencies[variant])}  ({mean - baseline:+.3f} ms vs no logging)")
+
+
+if __name__ == "__main__":
+    main()
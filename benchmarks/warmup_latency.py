@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Request latency right after startup, with and without database warm-up.
+
+Each run starts a fresh worker process with DB_WARMUP_CONNECTIONS set, boots
+the app (running its startup event) and times the first N authenticated
+GET /todos/ requests through TestClient.
+
+Usage:
+    python benchmarks/warmup_latency.py [--requests 1000] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import configure_environment, create_user_with_todos, percentile, summarize
+
+WARMUP_SETTINGS = (0, 4)
+
+
+def setup(work_dir: str) -> None:
+    """Create the schema and the benchmark user, then save its auth headers."""
+    configure_environment(work_dir, DB_WARMUP_CONNECTIONS=0)
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        headers = create_user_with_todos(client)
+
+    with open(os.path.join(work_dir, "headers.json"), "w") as f:
+        json.dump(headers, f)
+
+
+def measure(work_dir: str, warmup_connections: int, requests: int) -> None:
+    """Boot a fresh app and record the latency of the first requests."""
+    configure_environment(work_dir, DB_WARMUP_CONNECTIONS=warmup_connections)
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with open(os.path.join(work_dir, "headers.json")) as f:
+        headers = json.load(f)
+
+    latencies = []
+    with TestClient(app) as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.get("/todos/", headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    with open(os.path.join(work_dir, f"latencies-{warmup_connections}.json"), "w") as f:
+        json.dump(latencies, f)
+
+
+def run_child(*args) -> None:
+    subprocess.run([sys.executable, os.path.abspath(__file__), *map(str, args)], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="todo-bench-")
+    run_child("setup", work_dir)
+
+    results = {setting: {"first": [], "all": []} for setting in WARMUP_SETTINGS}
+    for _ in range(args.runs):
+        # Alternate the settings so both see the same machine noise
+        for setting in WARMUP_SETTINGS:
+            run_child("measure", work_dir, setting, args.requests)
+            with open(os.path.join(work_dir, f"latencies-{setting}.json")) as f:
+                latencies = json.load(f)
+            results[setting]["first"].append(latencies[0])
+            results[setting]["all"].extend(latencies)
+
+    print(f"{args.runs} fresh workers x {args.requests} GET /todos/ requests each")
+    for setting in WARMUP_SETTINGS:
+        first = results[setting]["first"]
+        print(f"DB_WARMUP_CONNECTIONS={setting}: {summarize(results[setting]['all'])}  "
+              f"first request p50 {percentile(first, 50):.3f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "setup":
+        setup(sys.argv[2])
+    elif len(sys.argv) > 1 and sys.argv[1] == "measure":
+        measure(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
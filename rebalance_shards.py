@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Shard rebalancing script.
+Moves a user and their todos to another database shard while the API stays up.
+"""
+
+import sys
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+def move_user(email, target_shard):
+    """Move a single user to the target shard."""
+    from app.database.sharding import move_user as move_user_to_shard
+
+    try:
+        if move_user_to_shard(email, target_shard):
+            print(f"Moved {email} to shard {target_shard}.")
+        else:
+            print(f"{email} is already on shard {target_shard}.")
+        return True
+    except Exception as e:
+        print(f"Error moving {email}: {e}")
+        return False
+
+def show_status():
+    """Print how many users live on each shard."""
+    from sqlalchemy import func, select
+    from app.database.database import SessionLocal, shard_engines
+    from app.database.models import UserDirectory
+
+    db = SessionLocal()
+    try:
+        counts = dict(db.execute(
+            select(UserDirectory.shard, func.count(UserDirectory.user_id)).group_by(UserDirectory.shard)
+        ).all())
+    finally:
+        db.close()
+
+    for shard in range(len(shard_engines)):
+        print(f"Shard {shard}: {counts.get(shard, 0)} users")
+    return True
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print("  python rebalance_shards.py status                  # Show users per shard")
+        print("  python rebalance_shards.py move <email> <shard>    # Move a user to another shard")
+        sys.exit(1)
+
+    command = sys.argv[1].lower()
+
+    # Validate DATABASE_URL is set
+    if not os.getenv("DATABASE_URL"):
+        print("Error: DATABASE_URL environment variable is not set")
+        sys.exit(1)
+
+    if command == "status":
+        success = show_status()
+        sys.exit(0 if success else 1)
+    elif command == "move":
+        if len(sys.argv) < 4 or not sys.argv[3].isdigit():
+            print("Usage: python rebalance_shards.py move <email> <shard>")
+            sys.exit(1)
+        success = move_user(sys.argv[2], int(sys.argv[3]))
+        sys.exit(0 if success else 1)
+    else:
+        print(f"Unknown command: {command}")
+        print("Valid commands: status, move")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Reconciliation script for the per-user todo stats counters.
+Rebuilds user_todo_stats and user_todo_daily_stats from the todos table.
+"""
+
+import sys
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+def rebuild_stats():
+    """Rebuild all todo stats counters from scratch on every shard."""
+    from app.database.database import get_shard_session, shard_engines
+    from app.todos.stats import rebuild_todo_stats
+
+    for shard in range(len(shard_engines)):
+        db = get_shard_session(shard)
+        try:
+            users = rebuild_todo_stats(db)
+            print(f"Todo stats rebuilt for {users} users on shard {shard}.")
+        except Exception as e:
+            db.rollback()
+            print(f"Error rebuilding todo stats on shard {shard}: {e}")
+            return False
+        finally:
+            db.close()
+
+    return True
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print("  python reconcile_stats.py rebuild    # Rebuild todo stats counters from the todos table")
+        sys.exit(1)
+
+    command = sys.argv[1].lower()
+
+    # Validate DATABASE_URL is set
+    if not os.getenv("DATABASE_URL"):
+        print("Error: DATABASE_URL environment variable is not set")
+        sys.exit(1)
+
+    if command == "rebuild":
+        success = rebuild_stats()
+        sys.exit(0 if success else 1)
+    else:
+        print(f"Unknown command: {command}")
+        print("Valid commands: rebuild")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
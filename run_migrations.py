@@ -1,73 +1,148 @@
 #!/usr/bin/env python
 """
 Migration runner script for production environments like Render.
-This script allows manual execution of Alembic migrations.
+Runs Alembic in-process through its command API. When several replicas
+start at once, a database lock (Postgres advisory lock, or a file lock for
+SQLite) lets one replica migrate while the others wait for it to finish.
 """
 
-import subprocess
-import sys
+import fcntl
 import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
 from dotenv import load_dotenv
 
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, pool, text
+from sqlalchemy.engine import make_url
+
 # Load environment variables
 load_dotenv()
 
-def run_migrations():
-    """Run alembic migrations to upgrade to the latest version."""
-    try:
-        # Run alembic upgrade to head
-        result = subprocess.run([
-            "alembic", "upgrade", "head"
-        ], check=True, capture_output=True, text=True)
-
-        print("Migrations completed successfully!")
-        print(result.stdout)
-        return True
-
-    except subprocess.CalledProcessError as e:
-        print(f"Error running migrations: {e}")
-        print(f"Stderr: {e.stderr}")
-        return False
-    except FileNotFoundError:
-        print("Error: Alembic is not installed or not in PATH")
-        print("Please make sure to install alembic: pip install alembic")
-        return False
+# Arbitrary application-wide key for pg_advisory_xact_lock
+MIGRATION_LOCK_ID = 726354100901
+
+PROJECT_ROOT = Path(__file__).parent
+ALEMBIC_INI = str(PROJECT_ROOT / "alembic.ini")
+
+def get_database_urls():
+    """Primary database followed by any additional shard databases."""
+    urls = [os.getenv("DATABASE_URL")]
+    for url in os.getenv("DATABASE_SHARD_URLS", "").split(","):
+        url = url.strip()
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+def get_alembic_config(database_url):
+    """Alembic config pointed at a single database."""
+    config = Config(ALEMBIC_INI)
+    # Resolve the scripts relative to this file rather than the working directory
+    config.set_main_option("script_location", str(PROJECT_ROOT / "alembic"))
+    config.attributes["database_url"] = database_url
+    return config
+
+def get_current_heads(connection):
+    """Revisions currently applied to the database."""
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+@contextmanager
+def migration_lock(connection, database_url):
+    """Hold the cross-replica migration lock for this database."""
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql":
+        # Released automatically when the surrounding transaction ends
+        connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        yield
+        return
+
+    # SQLite: lock a file next to the database (or in the cwd for in-memory)
+    lock_path = f"{url.database}.migrate.lock" if url.database else ".migrate.lock"
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def upgrade_database(database_url):
+    """Upgrade one database to head, skipping the lock when already current."""
+    config = get_alembic_config(database_url)
+    head_revisions = set(ScriptDirectory.from_config(config).get_heads())
+    engine = create_engine(database_url, poolclass=pool.NullPool)
 
-def check_migrations_status():
-    """Check the current migration status."""
     try:
-        result = subprocess.run([
-            "alembic", "current"
-        ], check=True, capture_output=True, text=True)
+        # Fast path: nothing to do, so don't contend for the lock at all
+        with engine.connect() as connection:
+            if get_current_heads(connection) == head_revisions:
+                return False
+
+        with engine.begin() as connection:
+            with migration_lock(connection, database_url):
+                # Another replica may have migrated while we waited for the lock
+                if get_current_heads(connection) == head_revisions:
+                    return False
+
+                config.attributes["connection"] = connection
+                command.upgrade(config, "head")
+                return True
+    finally:
+        engine.dispose()
 
-        print("Current migration status:")
-        print(result.stdout)
-        return True
+def run_migrations():
+    """Run alembic migrations to upgrade every database to the latest version."""
+    for index, database_url in enumerate(get_database_urls()):
+        start = time.perf_counter()
+        try:
+            upgraded = upgrade_database(database_url)
+        except Exception as e:
+            print(f"Error running migrations for database {index}: {e}")
+            return False
+
+        elapsed = time.perf_counter() - start
+        if upgraded:
+            print(f"Migrations completed successfully for database {index} ({elapsed:.2f}s)!")
+        else:
+            print(f"Database {index} is already at the latest revision ({elapsed:.2f}s).")
+
+    return True
 
-    except subprocess.CalledProcessError as e:
-        print(f"Error checking migration status: {e}")
-        print(f"Stderr: {e.stderr}")
-        return False
-    except FileNotFoundError:
-        print("Error: Alembic is not installed or not in PATH")
-        return False
+def check_migrations_status():
+    """Check the current migration status of every database."""
+    for index, database_url in enumerate(get_database_urls()):
+        try:
+            engine = create_engine(database_url, poolclass=pool.NullPool)
+            try:
+                with engine.connect() as connection:
+                    current = get_current_heads(connection)
+            finally:
+                engine.dispose()
+
+            heads = set(ScriptDirectory.from_config(get_alembic_config(database_url)).get_heads())
+            print(f"Current migration status for database {index}:")
+            print(f"  current: {', '.join(sorted(current)) or 'none'}")
+            print(f"  head:    {', '.join(sorted(heads))}")
+
+        except Exception as e:
+            print(f"Error checking migration status: {e}")
+            return False
+
+    return True
 
 def generate_migration(message):
-    """Generate a new migration file."""
+    """Generate a new migration file against the primary database."""
     try:
-        result = subprocess.run([
-            "alembic", "revision", "--autogenerate", "-m", message
-        ], check=True, capture_output=True, text=True)
-
-        print(f"Migration generated: {result.stdout}")
+        command.revision(get_alembic_config(os.getenv("DATABASE_URL")), message=message, autogenerate=True)
+        print(f"Migration generated: {message}")
         return True
 
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         print(f"Error generating migration: {e}")
-        print(f"Stderr: {e.stderr}")
-        return False
-    except FileNotFoundError:
-        print("Error: Alembic is not installed or not in PATH")
         return False
 
 def main():
@@ -78,7 +153,7 @@ def main():
         print("  python run_migrations.py generate \"message\"    # Generate new migration")
         sys.exit(1)
 
-    command = sys.argv[1].lower()
+    command_name = sys.argv[1].lower()
 
     # Validate DATABASE_URL is set
     database_url = os.getenv("DATABASE_URL")
@@ -88,13 +163,13 @@ def main():
 
     print(f"Using database: {'PostgreSQL' if 'postgresql' in database_url.lower() else 'SQLite'}")
 
-    if command == "upgrade":
+    if command_name == "upgrade":
         success = run_migrations()
         sys.exit(0 if success else 1)
-    elif command == "current":
+    elif command_name == "current":
         success = check_migrations_status()
         sys.exit(0 if success else 1)
-    elif command == "generate":
+    elif command_name == "generate":
         if len(sys.argv) < 3:
             print("Error: Please provide a message for the migration")
             print("Usage: python run_migrations.py generate \"migration message\"")
@@ -103,9 +178,9 @@ def main():
         success = generate_migration(message)
         sys.exit(0 if success else 1)
     else:
-        print(f"Unknown command: {command}")
+        print(f"Unknown command: {command_name}")
         print("Valid commands: upgrade, current, generate")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
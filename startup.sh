@@ -13,11 +13,15 @@ fi
 
 echo "DATABASE_URL is set"
 
-# Install dependencies
-echo "Installing dependencies..."
-pip install -r requirements.txt
+# Dependencies are installed when the image is built; only install them
+# here if this environment is missing them
+if ! python -c "import fastapi, sqlalchemy, alembic, gunicorn" 2>/dev/null; then
+    echo "Installing dependencies..."
+    pip install -r requirements.txt
+fi
 
-# Run database migrations
+# Run database migrations (in-process and lock-guarded; a no-op when the
+# schema is already at the latest revision)
 echo "Running database migrations..."
 python run_migrations.py upgrade
 
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# The engines and settings are created at import time, so the environment must
+# point at a throwaway database before anything under app/ is imported
+_TEST_DIR = tempfile.mkdtemp(prefix="todo-tests-")
+_PRIMARY_URL = f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ.update({
+    "DATABASE_URL": _PRIMARY_URL,
+    # Two shards, the first on the primary, so both routing paths are exercised
+    "DATABASE_SHARD_URLS": f"{_PRIMARY_URL},sqlite:///{os.path.join(_TEST_DIR, 'shard1.db')}",
+    "SECRET_KEY": "test-secret-key",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ENVIRONMENT": "development",
+    "LOG_LEVEL": "WARNING",
+    "DB_WARMUP_CONNECTIONS": "0",
+    "PROFILE_DIR": os.path.join(_TEST_DIR, "profiles"),
+})
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def sign_up(client):
+    """Create a fresh user and return its email and bearer token headers."""
+    email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+    password = "test-password"
+    client.post("/auth/signup", json={"email": email, "password": password}).raise_for_status()
+    response = client.post("/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return email, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Bearer token headers for a freshly signed-up user."""
+    return sign_up(client)[1]
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from collections import Counter
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.admin.profiling import profiler
+from app.database.database import get_db
+from app.main import app
+from app.utils import profiling
+from app.utils.fractional_index import evenly_spaced_keys
+from app.utils.profiling import ProfileRing, ProfilingController, ProfilingMiddleware, StackSampler
+
+
+@pytest.fixture(autouse=True)
+def profiling_off():
+    profiler.disable()
+    yield
+    profiler.disable()
+
+
+def busy_in_app_code(stop):
+    while not stop.is_set():
+        evenly_spaced_keys(500)
+
+
+def other_work_in_app_code(stop):
+    while not stop.is_set():
+        evenly_spaced_keys(500)
+
+
+def test_disabled_profiling_does_no_work(client, auth_headers, monkeypatch):
+    calls = []
+
+    def record(name):
+        def fail(*args, **kwargs):
+            calls.append(name)
+            raise AssertionError(f"{name} called while profiling is disabled")
+        return fail
+
+    monkeypatch.setattr(ProfilingController, "claim", record("claim"))
+    monkeypatch.setattr(ProfilingMiddleware, "_route_for", record("_route_for"))
+    monkeypatch.setattr(StackSampler, "start", record("StackSampler.start"))
+
+    assert not profiler.enabled
+    for _ in range(3):
+        assert client.get("/todos/", headers=auth_headers).status_code == 200
+    assert client.get("/health").status_code == 200
+
+    assert calls == []
+    assert not event.contains(Session, "do_orm_execute", profiling._record_profiled_thread)
+
+
+def test_thread_tracking_is_installed_only_while_armed():
+    profiler.profile_next(1)
+    assert event.contains(Session, "do_orm_execute", profiling._record_profiled_thread)
+
+    profiler.disable()
+    assert not event.contains(Session, "do_orm_execute", profiling._record_profiled_thread)
+
+
+def test_dependency_overrides_still_apply(client, auth_headers):
+    overridden = []
+
+    def override_get_db():
+        overridden.append(True)
+        yield from get_db()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        assert client.get("/todos/", headers=auth_headers).status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_db)
+
+    assert overridden
+
+
+def test_sampler_only_samples_the_given_threads():
+    stop = threading.Event()
+    profiled = threading.Thread(target=busy_in_app_code, args=(stop,))
+    other = threading.Thread(target=other_work_in_app_code, args=(stop,))
+    profiled.start()
+    other.start()
+    try:
+        sampler = StackSampler(0.001, {profiled.ident})
+        sampler.start()
+        time.sleep(0.2)
+        samples = sampler.stop()
+    finally:
+        stop.set()
+        profiled.join()
+        other.join()
+
+    assert samples
+    assert all("busy_in_app_code" in stack for stack in samples)
+    assert not any("other_work_in_app_code" in stack for stack in samples)
+
+
+def test_profile_contains_only_the_profiled_request(client, auth_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(profiler, "ring", ProfileRing(str(tmp_path), 5))
+    monkeypatch.setattr(profiler, "interval", 0.002)
+
+    # Keep the request in the todo list query long enough to be sampled
+    def slow_list_query(conn, cursor, statement, parameters, context, executemany):
+        if "ORDER BY todos.position" in statement:
+            time.sleep(0.2)
+
+    stop = threading.Event()
+    unrelated = threading.Thread(target=busy_in_app_code, args=(stop,))
+    unrelated.start()
+    event.listen(Engine, "before_cursor_execute", slow_list_query)
+    try:
+        profiler.profile_next(1)
+        assert client.get("/todos/", headers=auth_headers).status_code == 200
+    finally:
+        event.remove(Engine, "before_cursor_execute", slow_list_query)
+        stop.set()
+        unrelated.join()
+
+    names = profiler.ring.list()
+    assert len(names) == 1
+    profile = profiler.ring.read(names[0])
+    assert "get_todos" in profile
+    assert "busy_in_app_code" not in profile
+
+
+def test_ring_tolerates_files_removed_by_other_workers(tmp_path, monkeypatch):
+    ring = ProfileRing(str(tmp_path), 2)
+    first = ring.save("/todos/", "a" * 32, Counter({"stack": 1}))
+    time.sleep(0.01)
+    second = ring.save("/todos/", "b" * 32, Counter({"stack": 1}))
+
+    real_getmtime = os.path.getmtime
+    real_remove = os.remove
+
+    def getmtime(path):
+        if path.endswith(first):
+            raise FileNotFoundError(path)
+        return real_getmtime(path)
+
+    monkeypatch.setattr(profiling.os.path, "getmtime", getmtime)
+    assert ring.list() == [second]
+    monkeypatch.setattr(profiling.os.path, "getmtime", real_getmtime)
+
+    def remove(path):
+        real_remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(profiling.os, "remove", remove)
+    time.sleep(0.01)
+    third = ring.save("/todos/", "c" * 32, Counter({"stack": 1}))
+    assert ring.list() == [third, second]
+
+    real_remove(os.path.join(str(tmp_path), second))
+    assert ring.read(second) is None
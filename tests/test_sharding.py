@@ -0,0 +1,210 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.engine import Engine
+
+from app.database.database import (
+    SessionLocal,
+    get_shard_session,
+    is_primary_shard,
+    shard_engines,
+    verify_shard_directory,
+)
+from app.database.models import User, UserDirectory
+from app.database.sharding import move_user
+from app.utils.security import lock_user_for_writes
+from conftest import sign_up
+
+
+def home_shard(email):
+    db = SessionLocal()
+    try:
+        return db.query(UserDirectory).filter_by(email=email).one().shard
+    finally:
+        db.close()
+
+
+def test_todo_ids_are_unique_across_shards(client):
+    users = [sign_up(client) for _ in range(2)]
+    assert {home_shard(email) for email, _ in users} == set(range(len(shard_engines)))
+
+    ids = []
+    for _, headers in users:
+        for i in range(3):
+            ids.append(client.post("/todos/", json={"title": f"Todo {i}"}, headers=headers).json()["id"])
+
+    assert len(set(ids)) == len(ids)
+
+
+def test_moving_a_user_keeps_todo_ids(client):
+    email, headers = sign_up(client)
+    for i in range(3):
+        client.post("/todos/", json={"title": f"Todo {i}"}, headers=headers).raise_for_status()
+    client.post("/todos/", json={"title": "Done", "completed": True}, headers=headers).raise_for_status()
+    before = client.get("/todos/", headers=headers).json()
+    stats_before = client.get("/todos/stats", headers=headers).json()
+
+    target = 1 - home_shard(email)
+    assert move_user(email, target)
+    assert home_shard(email) == target
+
+    after = client.get("/todos/", headers=headers).json()
+    assert after == before
+    assert client.get("/todos/stats", headers=headers).json() == stats_before
+
+    # Ids handed out before the move still address the same todos
+    response = client.patch(f"/todos/{before[0]['id']}/toggle", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == before[0]["title"]
+
+
+def test_move_waits_for_in_flight_writes(client):
+    # Use a user off the primary so the move is held by the user lock itself
+    email, headers = sign_up(client)
+    while is_primary_shard(home_shard(email)):
+        email, headers = sign_up(client)
+    client.post("/todos/", json={"title": "Existing"}, headers=headers).raise_for_status()
+
+    # Hold a create between taking the user's write lock and inserting its todo
+    insert_reached = threading.Event()
+    release_insert = threading.Event()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO todos") and not insert_reached.is_set():
+            insert_reached.set()
+            assert release_insert.wait(10)
+
+    responses = []
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        writer = threading.Thread(target=lambda: responses.append(
+            client.post("/todos/", json={"title": "In flight"}, headers=headers)
+        ))
+        writer.start()
+        assert insert_reached.wait(10)
+
+        target = 1 - home_shard(email)
+        mover = threading.Thread(target=move_user, args=(email, target))
+        mover.start()
+        mover.join(0.5)
+        # The move can't copy the user while the write is still open
+        assert mover.is_alive()
+
+        release_insert.set()
+        writer.join(10)
+        mover.join(10)
+    finally:
+        release_insert.set()
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+    assert responses[0].status_code == 200
+    assert home_shard(email) == target
+    titles = [todo["title"] for todo in client.get("/todos/", headers=headers).json()]
+    assert titles == ["Existing", "In flight"]
+
+
+def test_write_blocked_by_a_move_is_told_to_retry(client):
+    email, headers = sign_up(client)
+    todo = client.post("/todos/", json={"title": "Existing"}, headers=headers).json()
+    source = home_shard(email)
+
+    # Route a write to the source shard, then move the user before it takes the lock
+    db = get_shard_session(source)
+    try:
+        move_user(email, 1 - source)
+        with pytest.raises(HTTPException) as error:
+            lock_user_for_writes(db, todo["user_id"])
+        assert error.value.status_code == 503
+    finally:
+        db.close()
+
+    response = client.patch(f"/todos/{todo['id']}/toggle", headers=headers)
+    assert response.status_code == 200
+
+
+def test_startup_check_rejects_misrouted_directory_entries():
+    verify_shard_directory()
+
+    # A user stored on the primary but routed to the other shard
+    db = SessionLocal()
+    try:
+        user_id = db.scalar(select(func.max(UserDirectory.user_id))) + 1000
+        db.add(User(id=user_id, email=f"misrouted-{user_id}@example.com", hashed_password="x"))
+        db.add(UserDirectory(user_id=user_id, email=f"misrouted-{user_id}@example.com", shard=1))
+        db.commit()
+
+        with pytest.raises(RuntimeError, match="shard 1"):
+            verify_shard_directory()
+    finally:
+        db.execute(delete(UserDirectory).where(UserDirectory.user_id == user_id))
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+        db.close()
+
+    verify_shard_directory()
+
+
+def test_create_reserves_a_new_id_block_on_the_primary_shard(client, monkeypatch):
+    from app.database.id_allocator import todo_ids
+
+    email, headers = sign_up(client)
+    while not is_primary_shard(home_shard(email)):
+        email, headers = sign_up(client)
+
+    # Force the next create to reserve a block while the user lives on the primary
+    monkeypatch.setattr(todo_ids, "_next", todo_ids._end)
+    response = client.post("/todos/", json={"title": "New block"}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["id"] == todo_ids._end - todo_ids.block_size
+
+
+def test_cached_route_skips_the_directory_until_the_user_moves(client):
+    email, headers = sign_up(client)
+    client.post("/todos/", json={"title": "Existing"}, headers=headers).raise_for_status()
+
+    directory_queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "user_directory" in statement:
+            directory_queries.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        client.get("/todos/", headers=headers).raise_for_status()
+        client.post("/todos/", json={"title": "Cached"}, headers=headers).raise_for_status()
+        assert directory_queries == []
+
+        move_user(email, 1 - home_shard(email))
+        directory_queries.clear()
+
+        # The stale route finds no user and is looked up again, once
+        titles = [todo["title"] for todo in client.get("/todos/", headers=headers).json()]
+        assert titles == ["Existing", "Cached"]
+        assert len(directory_queries) == 1
+        client.post("/todos/", json={"title": "After"}, headers=headers).raise_for_status()
+        assert len(directory_queries) == 1
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+
+def test_rejected_creates_do_not_allocate_ids(client, monkeypatch):
+    from app.database.id_allocator import todo_ids
+
+    _, headers = sign_up(client)
+    allocated = []
+    allocate = todo_ids.allocate
+    monkeypatch.setattr(todo_ids, "allocate", lambda: allocated.append(allocate()) or allocated[-1])
+
+    assert client.post("/todos/", json={"title": "Anonymous"}).status_code == 403
+    bad_token = {"Authorization": "Bearer not-a-token"}
+    assert client.post("/todos/", json={"title": "Forged"}, headers=bad_token).status_code == 401
+    assert client.post("/todos/", json={"description": "No title"}, headers=headers).status_code == 422
+    assert allocated == []
+
+    response = client.post("/todos/", json={"title": "Valid"}, headers=headers)
+    assert response.status_code == 200
+    assert allocated == [response.json()["id"]]
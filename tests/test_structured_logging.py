@@ -0,0 +1,27 @@
+import json
+import logging
+import queue
+
+from app.utils.structured_logging import JsonFormatter, StructuredQueueHandler
+
+
+def test_queued_exception_is_logged_as_a_separate_field():
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger("tests.structured_logging")
+    logger.propagate = False
+    logger.addHandler(StructuredQueueHandler(log_queue))
+    try:
+        try:
+            raise ValueError("bad value")
+        except ValueError:
+            logger.exception("failed to handle %s", "request", extra={"route": "/todos/"})
+    finally:
+        logger.handlers.clear()
+        logger.propagate = True
+
+    entry = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+
+    assert entry["message"] == "failed to handle request"
+    assert entry["route"] == "/todos/"
+    assert entry["exc_info"].startswith("Traceback (most recent call last):")
+    assert entry["exc_info"].endswith("ValueError: bad value")
@@ -0,0 +1,119 @@
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.todos import crud
+from app.todos.crud import rebalance_todo_positions
+from app.utils.fractional_index import key_between
+
+
+def test_concurrent_creates_get_distinct_positions(client, auth_headers):
+    responses = [None] * 5
+
+    def create(index):
+        responses[index] = client.post("/todos/", json={"title": f"Todo {index}"}, headers=auth_headers)
+
+    threads = [threading.Thread(target=create, args=(i,)) for i in range(len(responses))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(20)
+
+    assert [response.status_code for response in responses] == [200] * len(responses)
+    positions = [todo["position"] for todo in client.get("/todos/", headers=auth_headers).json()]
+    assert len(positions) == len(responses)
+    assert len(set(positions)) == len(positions)
+
+
+def test_create_retries_when_its_position_is_taken(client, auth_headers, monkeypatch):
+    client.post("/todos/", json={"title": "First"}, headers=auth_headers).raise_for_status()
+
+    # Hand out the key another writer already took, as a lost race would
+    calls = []
+
+    def racing_key_between(a, b):
+        calls.append((a, b))
+        return a if len(calls) == 1 else key_between(a, b)
+
+    monkeypatch.setattr(crud, "key_between", racing_key_between)
+    response = client.post("/todos/", json={"title": "Second"}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+    todos = client.get("/todos/", headers=auth_headers).json()
+    assert [todo["title"] for todo in todos] == ["First", "Second"]
+    assert todos[0]["position"] < todos[1]["position"]
+
+
+def test_rebalance_keeps_order_under_unique_positions(client, auth_headers):
+    from app.database.database import shard_engines, shard_for_user
+
+    for i in range(5):
+        client.post("/todos/", json={"title": f"Todo {i}"}, headers=auth_headers).raise_for_status()
+    before = client.get("/todos/", headers=auth_headers).json()
+
+    user_id = before[0]["user_id"]
+    rebalance_todo_positions(user_id, shard_engines[shard_for_user(user_id)])
+
+    after = client.get("/todos/", headers=auth_headers).json()
+    assert [todo["id"] for todo in after] == [todo["id"] for todo in before]
+    assert len({todo["position"] for todo in after}) == 5
+
+
+def test_move_during_rebalance_lands_in_the_right_place(client, auth_headers):
+    from app.database.database import shard_engines, shard_for_user
+
+    for i in range(4):
+        client.post("/todos/", json={"title": f"Todo {i}"}, headers=auth_headers).raise_for_status()
+    todos = client.get("/todos/", headers=auth_headers).json()
+    user_id = todos[0]["user_id"]
+
+    # Hold the rebalance after it has taken the user's lock and read the keys
+    parked = threading.Event()
+    release = threading.Event()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany and statement.startswith("UPDATE todos SET position") and not parked.is_set():
+            parked.set()
+            assert release.wait(10)
+
+    responses = []
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        rebalance = threading.Thread(
+            target=rebalance_todo_positions, args=(user_id, shard_engines[shard_for_user(user_id)])
+        )
+        rebalance.start()
+        assert parked.wait(10)
+
+        # Move the last todo before the second one while the rebalance is open
+        mover = threading.Thread(target=lambda: responses.append(client.patch(
+            f"/todos/{todos[3]['id']}/move", json={"before_id": todos[1]["id"]}, headers=auth_headers
+        )))
+        mover.start()
+        mover.join(0.3)
+        assert mover.is_alive()
+
+        release.set()
+        rebalance.join(10)
+        mover.join(10)
+    finally:
+        release.set()
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+    assert responses[0].status_code == 200
+    order = [todo["id"] for todo in client.get("/todos/", headers=auth_headers).json()]
+    assert order == [todos[0]["id"], todos[3]["id"], todos[1]["id"], todos[2]["id"]]
+
+
+def test_rebalance_skips_users_no_longer_on_the_shard(client, auth_headers):
+    from app.database.database import shard_engines, shard_for_user
+
+    client.post("/todos/", json={"title": "Only"}, headers=auth_headers).raise_for_status()
+    todo = client.get("/todos/", headers=auth_headers).json()[0]
+    other_shard = shard_engines[1 - shard_for_user(todo["user_id"])]
+
+    rebalance_todo_positions(todo["user_id"], other_shard)
+
+    assert client.get("/todos/", headers=auth_headers).json() == [todo]
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.todos import crud
+from app.utils.single_flight import SingleFlight
+
+CONCURRENT_READS = 8
+
+
+class CountingSingleFlight(SingleFlight):
+    """SingleFlight that lets a test wait until every caller has joined."""
+
+    def __init__(self):
+        super().__init__()
+        self.callers = 0
+        self._joined = threading.Condition()
+
+    def do(self, key, fn):
+        with self._joined:
+            self.callers += 1
+            self._joined.notify_all()
+        return super().do(key, fn)
+
+    def wait_for_callers(self, count, timeout=10):
+        with self._joined:
+            assert self._joined.wait_for(lambda: self.callers >= count, timeout)
+        # Let the last callers get from the counter to waiting on the shared call
+        time.sleep(0.1)
+
+
+@pytest.fixture
+def todo_reads(monkeypatch):
+    reads = CountingSingleFlight()
+    monkeypatch.setattr(crud, "todo_reads", reads)
+    return reads
+
+
+@pytest.fixture
+def list_queries():
+    """Count todo list queries and hold the first one until released."""
+    state = {"count": 0, "entered": threading.Event(), "release": threading.Event()}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and "FROM todos" in statement \
+                and "ORDER BY todos.position" in statement:
+            state["count"] += 1
+            if state["count"] == 1:
+                state["entered"].set()
+                assert state["release"].wait(10)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    yield state
+    state["release"].set()
+    event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+def start_reads(client, headers, count):
+    responses = [None] * count
+
+    def read(index):
+        responses[index] = client.get("/todos/", headers=headers)
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, responses
+
+
+def test_concurrent_identical_reads_share_one_query(client, auth_headers, todo_reads, list_queries):
+    client.post("/todos/", json={"title": "Shared"}, headers=auth_headers).raise_for_status()
+
+    threads, responses = start_reads(client, auth_headers, CONCURRENT_READS)
+    assert list_queries["entered"].wait(10)
+    todo_reads.wait_for_callers(CONCURRENT_READS)
+    list_queries["release"].set()
+    for thread in threads:
+        thread.join(10)
+
+    assert list_queries["count"] == 1
+    assert all(response.status_code == 200 for response in responses)
+    assert all([todo["title"] for todo in response.json()] == ["Shared"] for response in responses)
+
+
+def test_write_during_read_makes_waiters_requery(client, auth_headers, todo_reads, list_queries):
+    client.post("/todos/", json={"title": "Before"}, headers=auth_headers).raise_for_status()
+
+    threads, responses = start_reads(client, auth_headers, CONCURRENT_READS)
+    assert list_queries["entered"].wait(10)
+    todo_reads.wait_for_callers(CONCURRENT_READS)
+
+    # The write commits while the shared read is still in flight
+    client.post("/todos/", json={"title": "After"}, headers=auth_headers).raise_for_status()
+    list_queries["release"].set()
+    for thread in threads:
+        thread.join(10)
+
+    # The leader's query plus one fresh query per waiter
+    assert list_queries["count"] == CONCURRENT_READS
+    titles = [[todo["title"] for todo in response.json()] for response in responses]
+    assert titles.count(["Before", "After"]) >= CONCURRENT_READS - 1
@@ -0,0 +1,56 @@
+from app.database.database import get_shard_session, shard_engines
+from app.todos.stats import rebuild_todo_stats
+
+
+def get_stats(client, headers):
+    response = client.get("/todos/stats", headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+
+def test_rebuild_matches_incremental_counters(client, auth_headers):
+    ids = []
+    for i in range(4):
+        response = client.post("/todos/", json={"title": f"Todo {i}"}, headers=auth_headers)
+        ids.append(response.json()["id"])
+    client.post("/todos/", json={"title": "Done on creation", "completed": True}, headers=auth_headers)
+
+    client.patch(f"/todos/{ids[0]}/toggle", headers=auth_headers).raise_for_status()
+    client.patch(f"/todos/{ids[1]}/toggle", headers=auth_headers).raise_for_status()
+    # Editing a completed todo must not move its completion
+    client.put(f"/todos/{ids[1]}", json={"title": "Renamed"}, headers=auth_headers).raise_for_status()
+    # Reopening takes the completion back
+    client.put(f"/todos/{ids[2]}", json={"completed": True}, headers=auth_headers).raise_for_status()
+    client.put(f"/todos/{ids[2]}", json={"completed": False}, headers=auth_headers).raise_for_status()
+    # Deleting a completed todo removes both its creation and its completion
+    client.delete(f"/todos/{ids[0]}", headers=auth_headers).raise_for_status()
+
+    incremental = get_stats(client, auth_headers)
+    assert incremental["total"] == 4
+    assert incremental["completed"] == 2
+    assert [(day["created"], day["completed"]) for day in incremental["daily"]] == [(4, 2)]
+
+    for shard in range(len(shard_engines)):
+        db = get_shard_session(shard)
+        try:
+            rebuild_todo_stats(db)
+        finally:
+            db.close()
+
+    assert get_stats(client, auth_headers) == incremental
+
+
+def test_deleting_every_todo_of_a_day_hides_the_day(client, auth_headers):
+    response = client.post("/todos/", json={"title": "Short-lived"}, headers=auth_headers)
+    client.delete(f"/todos/{response.json()['id']}", headers=auth_headers).raise_for_status()
+
+    assert get_stats(client, auth_headers) == {"total": 0, "completed": 0, "pending": 0, "daily": []}
+
+
+def test_creation_and_completion_share_one_clock(client, auth_headers):
+    response = client.post("/todos/", json={"title": "Done", "completed": True}, headers=auth_headers)
+    todo = response.json()
+
+    assert todo["created_at"] == todo["completed_at"]
+    daily = get_stats(client, auth_headers)["daily"]
+    assert daily == [{"day": todo["created_at"][:10], "created": 1, "completed": 1}]
@@ -0,0 +1,59 @@
+import time
+
+from app.utils.token_cache import TokenCache
+
+
+def claims(expires_in=60, **extra):
+    return {"sub": "user@example.com", "exp": time.time() + expires_in, **extra}
+
+
+def test_expired_entry_is_a_miss_and_is_evicted():
+    cache = TokenCache(max_size=10)
+    cache.set("token", claims(expires_in=-1))
+
+    assert cache.get("token") is None
+    assert cache.stats() == {"size": 0, "max_size": 10, "hits": 0, "misses": 1}
+
+
+def test_least_recently_used_entry_is_evicted_at_max_size():
+    cache = TokenCache(max_size=2)
+    cache.set("a", claims())
+    cache.set("b", claims())
+    # Touch "a" so "b" becomes the least recently used
+    assert cache.get("a") is not None
+    cache.set("c", claims())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["size"] == 2
+
+
+def test_tokens_without_numeric_expiry_are_not_cached():
+    cache = TokenCache(max_size=10)
+    cache.set("no-exp", {"sub": "user@example.com"})
+    cache.set("string-exp", {"sub": "user@example.com", "exp": "tomorrow"})
+
+    assert cache.get("no-exp") is None
+    assert cache.get("string-exp") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_zero_max_size_disables_the_cache():
+    cache = TokenCache(max_size=0)
+    cache.set("token", claims())
+
+    assert cache.get("token") is None
+    assert cache.stats() == {"size": 0, "max_size": 0, "hits": 0, "misses": 0}
+
+
+def test_callers_cannot_mutate_cached_claims():
+    cache = TokenCache(max_size=10)
+    original = claims(role="user")
+    cache.set("token", original)
+    original["role"] = "admin"
+
+    first = cache.get("token")
+    first["role"] = "admin"
+
+    assert cache.get("token")["role"] == "user"